@@ -1,23 +1,34 @@
 from collections import OrderedDict
-from typing import List
-
+from typing import Dict, List, Tuple
+
+from core.authentication import AccessToken, RefreshToken, is_denied
+from core.cache import recipe_cache
+from core.catalog import get_catalog_version
+from core.counters import change_counters
+from core.fields import BulkPrimaryKeyRelatedField, BulkSlugRelatedField
+from core.mixins import ProfiledSerializerMixin
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from recipes.models import (
-    Favorite,
     Ingredient,
     IngredientRecipe,
     Recipe,
-    ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from users.models import Follow, User
 
+VIEWER_FIELDS = ('image', 'is_favorited', 'is_in_shopping_cart')
+
 
-class UserSerializer(DjoserUserSerializer):
+class UserSerializer(ProfiledSerializerMixin, DjoserUserSerializer):
     """Сериализатор для использования с моделью User."""
 
     is_subscribed = serializers.SerializerMethodField(read_only=True)
@@ -35,6 +46,8 @@ class UserSerializer(DjoserUserSerializer):
 
     def get_is_subscribed(self, obj: User) -> bool:
         """Проверка подписки пользователей."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (
             request
@@ -64,18 +77,22 @@ class FollowListSerializer(UserSerializer):
         request = self.context.get('request')
         if not request:
             return False
-        limit = request.GET.get('recipes_limit')
+        if hasattr(obj, 'limited_recipes'):
+            return RecipeShortSerializer(obj.limited_recipes, many=True).data
+        serializer = RecipesLimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        limit = serializer.validated_data.get('recipes_limit')
         queryset = obj.recipes.all()
-        if limit:
-            queryset = queryset[: int(limit)]
+        if limit is not None:
+            queryset = queryset[:limit]
         return RecipeShortSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj: User) -> int:
         """Показывает общее количество рецептов у каждого автора."""
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для подписки на авторов."""
 
     class Meta:
@@ -98,7 +115,7 @@ class FollowSerializer(serializers.ModelSerializer):
         return FollowListSerializer(instance).data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Cериализатор отображение тэгов."""
 
     class Meta:
@@ -106,7 +123,9 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
     """Сериализатор для вывода ингридиентов."""
 
     class Meta:
@@ -114,7 +133,66 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientRecipeReadSerializer(serializers.ModelSerializer):
+class IngredientSearchSerializer(serializers.Serializer):
+    """Сериализатор параметров поиска ингредиентов по названию."""
+
+    name = serializers.CharField()
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Сериализатор ограничения числа рецептов в подписках."""
+
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка рецептов для массовых операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, recipes: List[int]) -> List[int]:
+        """Убирает повторы, сохраняя порядок."""
+        return list(dict.fromkeys(recipes))
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    """
+    Сериализатор обновления JWT.
+    Данные пользователя для нового токена берутся из базы,
+    поэтому устаревают не дольше, чем живёт токен доступа.
+    """
+
+    refresh = serializers.CharField(write_only=True)
+    auth_token = serializers.CharField(read_only=True)
+
+    def validate(self, data: OrderedDict) -> OrderedDict:
+        try:
+            refresh = RefreshToken(data['refresh'])
+        except TokenError:
+            raise serializers.ValidationError(
+                {'refresh': 'Токен недействителен или просрочен'}
+            )
+        if is_denied(refresh):
+            raise serializers.ValidationError({'refresh': 'Токен отозван'})
+        user = User.objects.filter(
+            pk=refresh[jwt_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None:
+            raise serializers.ValidationError(
+                {'refresh': 'Пользователь не найден'}
+            )
+        data['auth_token'] = str(AccessToken.for_user(user))
+        return data
+
+
+class IngredientRecipeReadSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
     """Сериализатор для отобоажения ингридиетов в рецепте."""
 
     id = serializers.ReadOnlyField(source='ingredient.id')
@@ -128,10 +206,21 @@ class IngredientRecipeReadSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'amount', 'measurement_unit')
 
 
+class IngredientRecipeCreateListSerializer(serializers.ListSerializer):
+    """Сериализатор списка ингредиентов, загружающий их одним запросом."""
+
+    def to_internal_value(self, data: list) -> list:
+        if isinstance(data, list):
+            self.child.fields['id'].resolve(
+                item.get('id') for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
+
+
 class IngredientRecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор создания ингридиентов."""
 
-    id = serializers.SlugRelatedField(
+    id = BulkSlugRelatedField(
         queryset=Ingredient.objects.all(), slug_field='id'
     )
     amount = serializers.IntegerField(write_only=True, min_value=1)
@@ -139,29 +228,148 @@ class IngredientRecipeCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientRecipe
         fields = ('id', 'amount')
+        list_serializer_class = IngredientRecipeCreateListSerializer
+
+
+class RecipeListSerializer(
+    ProfiledSerializerMixin, serializers.ListSerializer
+):
+    """
+    Списочный сериализатор рецептов с кешем представлений.
+    Представления всей страницы читаются из кеша одним запросом,
+    данные для промахов догружаются одной пачкой.
+    """
+
+    def to_representation(self, data) -> list:
+        """Собирает страницу из кеша и сериализует только промахи."""
+        if not recipe_cache.enabled:
+            return super().to_representation(data)
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        catalog_version = get_catalog_version()
+        stamps = {
+            recipe.id: self.child.get_stamp(recipe, catalog_version)
+            for recipe in recipes
+        }
+        cached = recipe_cache.get_many(stamps)
+        missing = [recipe for recipe in recipes if recipe.id not in cached]
+        if missing:
+            prefetch_related_objects(
+                missing,
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+            )
+            built = {
+                recipe.id: self.child.to_shared_representation(recipe)
+                for recipe in missing
+            }
+            recipe_cache.set_many(built, stamps)
+            cached.update(built)
+        return [
+            self.child.with_viewer_fields(cached[recipe.id], recipe)
+            for recipe in recipes
+        ]
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
     """Сериализатор для рецептов."""
 
     tags = TagSerializer(many=True)
     ingredients = serializers.SerializerMethodField()
-    author = UserSerializer(read_only=True)
+    author = serializers.SerializerMethodField()
     image = Base64ImageField(max_length=None)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('updated', 'favorites_count', 'in_carts_count')
+        list_serializer_class = RecipeListSerializer
+
+    @staticmethod
+    def get_stamp(obj: Recipe, catalog_version: int) -> tuple:
+        """
+        Отметка версии представления рецепта для кеша.
+        Меняется при правке рецепта, его автора и каталога, поэтому
+        устаревшая запись не совпадёт с отметкой в любом процессе.
+        """
+        return (
+            obj.updated.timestamp(),
+            obj.author.updated.timestamp(),
+            catalog_version,
+        )
+
+    def to_representation(self, instance: Recipe) -> OrderedDict:
+        """Берёт общую часть рецепта из кеша и добавляет поля запроса."""
+        if not recipe_cache.enabled:
+            return super().to_representation(instance)
+        stamps = {instance.id: self.get_stamp(instance, get_catalog_version())}
+        data = recipe_cache.get_many(stamps).get(instance.id)
+        if data is None:
+            data = self.to_shared_representation(instance)
+            recipe_cache.set_many({instance.id: data}, stamps)
+        return self.with_viewer_fields(data, instance)
+
+    def to_shared_representation(self, instance: Recipe) -> OrderedDict:
+        """Представление рецепта без полей, зависящих от запроса."""
+        data = super().to_representation(instance)
+        for field in VIEWER_FIELDS:
+            data[field] = None
+        data['author'] = OrderedDict(data['author'], is_subscribed=None)
+        return data
+
+    def with_viewer_fields(
+        self, data: OrderedDict, instance: Recipe
+    ) -> OrderedDict:
+        """Дополняет общую часть рецепта полями текущего запроса."""
+        data = OrderedDict(data)
+        data['image'] = self.fields['image'].to_representation(instance.image)
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        data['author'] = OrderedDict(
+            data['author'],
+            is_subscribed=self.get_author_is_subscribed(instance),
+        )
+        return data
 
     def get_ingredients(self, obj: Recipe) -> OrderedDict:
         """Получает ингридиенты для рецепта."""
-        ingredients = IngredientRecipe.objects.filter(recipe=obj).all()
-        return IngredientRecipeReadSerializer(ingredients, many=True).data
+        prefetch_related_objects(
+            [obj],
+            Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientRecipe.objects.select_related('ingredient'),
+            ),
+        )
+        return IngredientRecipeReadSerializer(
+            obj.recipe_ingredients.all(), many=True
+        ).data
+
+    def get_author(self, obj: Recipe) -> OrderedDict:
+        """Получает автора рецепта с признаком подписки из выборки."""
+        author = obj.author
+        if hasattr(obj, 'is_subscribed'):
+            author.is_subscribed = obj.is_subscribed
+        return UserSerializer(author, context=self.context).data
+
+    def get_author_is_subscribed(self, obj: Recipe) -> bool:
+        """Проверяет подписку текущего пользователя на автора рецепта."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return UserSerializer(context=self.context).get_is_subscribed(
+            obj.author
+        )
 
     def get_is_favorited(self, obj: Recipe) -> bool:
         """Проверяет рецепт в избранном."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -171,6 +379,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
         """Проверяет рецепт в корзине покупок."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -179,12 +389,12 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
+class RecipeWriteSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
     """Cериализатор создания рецепта."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
     ingredients = IngredientRecipeCreateSerializer(many=True)
     author = UserSerializer(read_only=True)
     image = Base64ImageField(max_length=None)
@@ -205,36 +415,29 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     def validate_tags(self, tags: List[Tag]) -> List[Tag]:
         """Проверка введёных данных тега."""
-        tags_list = []
         if not tags:
             raise serializers.ValidationError(
                 {'tags': 'Нужно выбрать хотя бы один тег'}
             )
-        for tag in tags:
-            if not Tag.objects.filter(id=tag.id).exists():
-                raise serializers.ValidationError(
-                    'Указанного тега не существует'
-                )
-            if tag.id in tags_list:
-                raise serializers.ValidationError(
-                    'Теги рецепта не могут повторяться'
-                )
-            tags_list.append(tag.id)
+        if len({tag.id for tag in tags}) != len(tags):
+            raise serializers.ValidationError(
+                'Теги рецепта не могут повторяться'
+            )
         return tags
 
     def validate_ingredients(self, ingredients: OrderedDict) -> OrderedDict:
         """Проверка введёных данных ингридиентов."""
-        ingredients_list = []
+        seen = set()
         if not ingredients:
             raise serializers.ValidationError(
                 'Нужно выбрать хотя бы один ингредиент'
             )
         for ingredient in ingredients:
-            if ingredient in ingredients_list:
+            if ingredient['id'].id in seen:
                 raise serializers.ValidationError(
                     'Ингредиенты в рецепте не могут повторяться'
                 )
-            ingredients_list.append(ingredient)
+            seen.add(ingredient['id'].id)
             if int(ingredient.get('amount')) < settings.MIN_VALUE:
                 raise serializers.ValidationError(
                     'Укажите верное кол-во ингредиента'
@@ -263,24 +466,76 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             ]
         )
 
+    @transaction.atomic
     def create(self, validated_data: dict) -> Recipe:
         """Создаёт рецепт."""
         request = self.context.get('request')
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=request.user, **validated_data)
+        change_counters(
+            User.objects.filter(pk=request.user.id), 1, 'recipes_count'
+        )
         recipe.tags.set(tags)
         self.add_ingredients(recipe=recipe, ingredients=ingredients)
         return recipe
 
+    @staticmethod
+    def update_ingredients(
+        recipe: Recipe, ingredients: OrderedDict
+    ) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """
+        Приводит ингредиенты рецепта к новому составу.
+        Добавляет, изменяет и удаляет только отличающиеся строки
+        и возвращает старые и новые количества по id ингредиента.
+        """
+        rows = list(IngredientRecipe.objects.filter(recipe=recipe))
+        current = {
+            row.ingredient_id: row
+            for row in rows
+            if row.ingredient_id is not None
+        }
+        old_amounts = {pk: row.amount for pk, row in current.items()}
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.id for row in rows if row.ingredient_id not in new_amounts
+        ]
+        if removed:
+            IngredientRecipe.objects.filter(id__in=removed).delete()
+        changed = []
+        for pk, amount in new_amounts.items():
+            row = current.get(pk)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        added = new_amounts.keys() - current.keys()
+        if added:
+            IngredientRecipe.objects.bulk_create(
+                [
+                    IngredientRecipe(
+                        recipe=recipe, ingredient_id=pk, amount=new_amounts[pk]
+                    )
+                    for pk in added
+                ]
+            )
+        return old_amounts, new_amounts
+
+    @transaction.atomic
     def update(self, instance: Recipe, validated_data: dict) -> Recipe:
-        """Изменияет рецепт."""
-        instance.tags.clear()
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        tags = validated_data.pop('tags')
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        self.add_ingredients(recipe=instance, ingredients=ingredients)
+        """Изменияет рецепт, записывая только изменившиеся связи."""
+        instance.tags.set(validated_data.pop('tags'))
+        old_amounts, new_amounts = self.update_ingredients(
+            instance, validated_data.pop('ingredients')
+        )
+        if old_amounts != new_amounts:
+            ShoppingListItem.objects.sync_recipe(
+                instance.id, old_amounts, new_amounts
+            )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance: Recipe) -> dict:
@@ -290,39 +545,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return RecipeReadSerializer(instance, context=context).data
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(
+    ProfiledSerializerMixin, serializers.ModelSerializer
+):
     """Сокращённый сериализатор рецептов для некоторых эндпоинтов."""
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для избранного."""
-
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-
-    def validate(self, data: OrderedDict) -> OrderedDict:
-        """Проверка на наличие рецепта в избранном."""
-        user = data['user']
-        if user.favorites.filter(recipe=data['recipe']).exists():
-            raise serializers.ValidationError('Рецепт уже в избранном')
-        return data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    """Сериализатор для списка покупок."""
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-
-    def validate(self, data: OrderedDict) -> OrderedDict:
-        """Проверка рецепта на наличие в списке покупок."""
-        user = data['user']
-        if user.shopping_cart.filter(recipe=data['recipe']).exists():
-            raise serializers.ValidationError('Рецепт уже в корзине')
-        return data
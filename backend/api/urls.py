@@ -1,7 +1,18 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (
+    CatalogView,
+    IngredientViewSet,
+    JWTLoginView,
+    JWTLogoutView,
+    JWTRefreshView,
+    MetricsView,
+    RecipeViewSet,
+    TagViewSet,
+    UserViewSet,
+)
 
 router = DefaultRouter()
 router.register('users', UserViewSet, basename='users')
@@ -9,8 +20,27 @@ router.register('tags', TagViewSet, basename='tags')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 
+auth_urls = [path('auth/', include('djoser.urls.authtoken'))]
+if settings.AUTH_MODE == 'jwt':
+    auth_urls = [
+        path('auth/token/login/', JWTLoginView.as_view(), name='login'),
+        path('auth/token/logout/', JWTLogoutView.as_view(), name='logout'),
+        path(
+            'auth/token/refresh/',
+            JWTRefreshView.as_view(),
+            name='token-refresh',
+        ),
+    ]
+
 urlpatterns = [
+    path('catalog/', CatalogView.as_view(), name='catalog'),
+    path(
+        'catalog/<str:content_hash>/',
+        CatalogView.as_view(),
+        name='catalog-version',
+    ),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
-    path('auth/', include('djoser.urls.authtoken')),
+    *auth_urls,
 ]
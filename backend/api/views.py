@@ -1,9 +1,46 @@
+from typing import List, Optional, Tuple, Union
+
+from core.authentication import RefreshToken, deny_token
+from core.cache import recipe_cache
+from core.catalog import catalog_snapshot, ingredient_index
+from core.counters import change_counters
 from core.filters import IngredientFilter, RecipeFilter
-from core.pagination import CustomPagination
-from core.permissions import IsAuthorOrReadOnly
-from django.db.models import Model, QuerySet, Sum
-from django.http import HttpResponse
+from core.metrics import load_snapshots
+from core.metrics import merge as merge_metrics
+from core.metrics import registry
+from core.metrics import render as render_metrics
+from core.mixins import ConditionalGetMixin, ProfiledViewMixin, Version
+from core.models import RECIPES_VERSION
+from core.models import Version as DataVersion
+from core.negotiation import FallbackContentNegotiation
+from core.pagination import SwitchablePagination
+from core.permissions import IsAdminOrLocalhost, IsAuthorOrReadOnly
+from core.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from core.shopping_list import EXPORTERS, PDF_ERRORS, iter_bytes, make_pdf
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    Max,
+    Model,
+    OuterRef,
+    Prefetch,
+    QuerySet,
+    Subquery,
+    Value,
+    prefetch_related_objects,
+)
+from django.db.models.expressions import RawSQL
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
+from djoser.views import TokenCreateView, TokenDestroyView
 from djoser.views import UserViewSet as DjoserUserViewSet
 from recipes.models import (
     Favorite,
@@ -11,31 +48,110 @@ from recipes.models import (
     IngredientRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BaseRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import SerializerMetaclass
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import Token
 from users.models import Follow, User
 
 from .serializers import (
-    FavoriteSerializer,
     FollowListSerializer,
     FollowSerializer,
+    IngredientSearchSerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
+    RecipesLimitSerializer,
     RecipeWriteSerializer,
-    ShoppingCartSerializer,
     TagSerializer,
+    TokenRefreshSerializer,
     UserSerializer,
 )
 
+ALREADY_ADDED = {
+    Favorite: 'Рецепт уже в избранном',
+    ShoppingCart: 'Рецепт уже в корзине',
+}
+
+
+def get_recipe_id(pk: str) -> int:
+    """Приводит id рецепта из адреса к числу, иначе ответ 404."""
+    try:
+        return Recipe._meta.pk.to_python(pk)
+    except DjangoValidationError:
+        raise NotFound
+
+
+class CatalogView(ProfiledViewMixin, APIView):
+    """
+    Снимок каталога тегов и ингредиентов одним сжатым JSON.
+    Адрес с хешем содержимого кешируется клиентом навсегда,
+    адрес без хеша отдаёт актуальный снимок с проверкой `ETag`.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    # Снимок кешируется под новой версией каталога сразу после загрузки,
+    # и отстающая реплика закешировала бы под ней старые данные.
+    use_primary_db = True
+
+    def get(self, request: Request, content_hash: str = None) -> HttpResponse:
+        """Метод отдаёт снимок каталога или ответ 304."""
+        snapshot = catalog_snapshot.get()
+        if content_hash is not None and content_hash != snapshot.hash:
+            raise NotFound('Версия каталога устарела')
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        etag = quote_etag(
+            f'{snapshot.hash}-gzip' if compress else snapshot.hash
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                snapshot.compressed if compress else snapshot.content,
+                content_type='application/json',
+            )
+            if compress:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if content_hash is None:
+            response['Cache-Control'] = 'public, no-cache'
+            response['Content-Location'] = reverse(
+                'catalog-version', args=(snapshot.hash,)
+            )
+        else:
+            response[
+                'Cache-Control'
+            ] = f'public, max-age={settings.CATALOG_MAX_AGE}, immutable'
+        return response
+
+
+class MetricsView(APIView):
+    """Метрики воркеров в текстовом формате Prometheus."""
+
+    permission_classes = (IsAdminOrLocalhost,)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    def get(self, request: Request) -> HttpResponse:
+        """Метод собирает метрики всех воркеров из общего каталога."""
+        return HttpResponse(
+            render_metrics(merge_metrics(load_snapshots(registry))),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class TagViewSet(ProfiledViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с тэгами."""
 
     queryset = Tag.objects.all()
@@ -46,7 +162,7 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('name',)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ProfiledViewMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с игридиентами."""
 
     queryset = Ingredient.objects.all()
@@ -55,41 +171,201 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filterset_class = IngredientFilter
 
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """Метод отвечает на поиск по названию из индекса в памяти."""
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            ingredient_index.get().search(
+                serializer.validated_data['name'],
+                serializer.validated_data.get('limit'),
+            )
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ProfiledViewMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     """ViewSet для работы с рецептами."""
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = SwitchablePagination
+    cursor_ordering = ('-created', '-id')
+    # Результаты поиска упорядочены по рангу совпадения.
+    cursor_excluded_params = ('search',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self) -> QuerySet:
+        """Метод собирает выборку рецептов с флагами текущего пользователя.
+
+        Автор, теги и ингредиенты подгружаются заранее, а признаки
+        избранного, корзины и подписки вычисляются подзапросами `Exists`,
+        поэтому число запросов не зависит от размера страницы.
+        При включённом кеше представлений теги и ингредиенты
+        догружаются сериализатором только для промахов кеша.
+        """
+        queryset = Recipe.objects.select_related('author')
+        if not recipe_cache.enabled:
+            queryset = queryset.prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=IngredientRecipe.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+            )
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('author'))
+            ),
+        )
+
+    def get_viewer_state(self) -> tuple:
+        """Метод возвращает отпечаток избранного, корзины и подписок.
+
+        Количество и наибольший id связей меняются при любом добавлении
+        или удалении, поэтому отпечаток дешево заменяет сами флаги.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return ()
+        annotations = {}
+        for name, model in (
+            ('favorites', Favorite),
+            ('cart', ShoppingCart),
+            ('follows', Follow),
+        ):
+            rows = model.objects.filter(user=OuterRef('pk')).values('user')
+            annotations[f'{name}_count'] = Subquery(
+                rows.annotate(value=Count('id')).values('value')
+            )
+            annotations[f'{name}_last'] = Subquery(
+                rows.annotate(value=Max('id')).values('value')
+            )
+        return (
+            User.objects.filter(pk=user.pk)
+            .annotate(**annotations)
+            .values_list(*annotations)
+            .get()
+        )
+
+    def get_list_version(self, request: Request) -> Version:
+        """Метод версионирует список по фильтрам, странице и правкам.
+
+        Версия рецептов меняется при любом создании, изменении
+        и удалении рецепта и при изменении данных авторов, поэтому
+        список не пересчитывается целиком. У списка нет даты изменения,
+        которая менялась бы при удалении, и `Last-Modified` не выдаётся.
+        """
+        parts = (
+            'list',
+            sorted(request.query_params.lists()),
+            DataVersion.objects.get_value(RECIPES_VERSION),
+            self.get_viewer_state(),
+        )
+        return parts, None
+
+    def get_object_version(
+        self, request: Request, pk: str
+    ) -> Optional[Version]:
+        """Метод версионирует рецепт по датам изменения и флагам.
+
+        В версию входят даты изменения рецепта и его автора. Правки
+        состава рецепта меняют дату его изменения, а версия каталога,
+        которую добавляет `conditional_response`, учитывает изменения
+        самих тегов и ингредиентов.
+        """
+        if not str(pk).isdigit():
+            return None
+        state = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .filter(pk=pk)
+            .values_list(
+                'updated',
+                'author__updated',
+                'is_favorited',
+                'is_in_shopping_cart',
+                'is_subscribed',
+            )
+            .first()
+        )
+        if state is None:
+            return None
+        updated, author_updated, *flags = state
+        modified = max(updated, author_updated).timestamp()
+        return (
+            'detail',
+            int(pk),
+            updated.timestamp(),
+            author_updated.timestamp(),
+            *flags,
+        ), modified
+
     def get_serializer_class(self) -> SerializerMetaclass:
         """Метод определяет сериализатор в соответствии запросу."""
         if self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance: Recipe) -> None:
+        """
+        Удаляет рецепт и уменьшает счётчик рецептов автора.
+        Списки покупок очищает сигнал удаления корзин.
+        """
+        instance.delete()
+        change_counters(
+            User.objects.filter(pk=instance.author_id), -1, 'recipes_count'
+        )
+
     @staticmethod
-    def add_to(
-        serializer_class: SerializerMetaclass, request: Request, pk: str
-    ) -> Response:
-        """Метод добавления объекта."""
-        context = {'request': request}
-        recipe = get_object_or_404(Recipe, id=pk)
-        data = {'user': request.user.id, 'recipe': recipe.id}
-        serializer = serializer_class(data=data, context=context)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def add_to(model: Model, request: Request, pk: str) -> Response:
+        """Метод добавляет рецепт одним запросом без проверки заранее."""
+        recipe_id = get_recipe_id(pk)
+        with transaction.atomic():
+            if not model.objects.add(request.user.id, recipe_id):
+                if not Recipe.objects.filter(pk=recipe_id).exists():
+                    raise NotFound
+                raise ValidationError(
+                    {api_settings.NON_FIELD_ERRORS_KEY: [ALREADY_ADDED[model]]}
+                )
+            change_counters(
+                Recipe.objects.filter(pk=recipe_id), 1, model.counter_field
+            )
+        return Response(
+            {'user': request.user.id, 'recipe': recipe_id},
+            status=status.HTTP_201_CREATED,
+        )
 
     @staticmethod
     def del_from(model: Model, request: Request, pk: str) -> Response:
         """Метод удаления объекта соответствующей модели."""
-        get_object_or_404(
-            model, user=request.user, recipe=get_object_or_404(Recipe, id=pk)
-        ).delete()
+        recipe_id = get_recipe_id(pk)
+        with transaction.atomic():
+            if not model.objects.remove(request.user.id, recipe_id):
+                raise NotFound
+            change_counters(
+                Recipe.objects.filter(pk=recipe_id), -1, model.counter_field
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -101,7 +377,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorites(self, request: Request, pk: str) -> Response:
         """Добавляет/удалет рецепт в `избранное`."""
         if request.method == 'POST':
-            return self.add_to(FavoriteSerializer, request, pk)
+            return self.add_to(Favorite, request, pk)
         return self.del_from(Favorite, request, pk)
 
     @action(
@@ -112,22 +388,150 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request: Request, pk: str) -> Response:
         """Добавляет/удаляет рецепт в `список покупок`."""
-        if request.method == 'POST':
-            return self.add_to(ShoppingCartSerializer, request, pk)
-        return self.del_from(ShoppingCart, request, pk)
+        with transaction.atomic():
+            if request.method == 'POST':
+                response = self.add_to(ShoppingCart, request, pk)
+                ShoppingListItem.objects.add_recipe(
+                    request.user.id, response.data['recipe']
+                )
+                return response
+            response = self.del_from(ShoppingCart, request, pk)
+            ShoppingListItem.objects.remove_recipe(
+                request.user.id, get_recipe_id(pk)
+            )
+        return response
 
     @staticmethod
-    def download_shopping_list(ingredients: QuerySet) -> HttpResponse:
-        """Метод выгружает список покупок в формате txt."""
-        shopping_list = 'Нужно купить:'
-        for ingredient in ingredients:
-            shopping_list += (
-                f'\n{ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]}) - '
-                f'{ingredient["amount"]}'
+    def bulk_change(
+        model: Model, request: Request
+    ) -> Tuple[List[int], Response]:
+        """
+        Метод добавляет или удаляет список рецептов одним запросом
+        и возвращает изменённые id и ответ со статусом каждого рецепта.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        with transaction.atomic():
+            if request.method == 'POST':
+                changed = model.objects.add_many(request.user.id, recipe_ids)
+                delta, done = 1, 'added'
+            else:
+                changed = model.objects.remove_many(
+                    request.user.id, recipe_ids
+                )
+                delta, done = -1, 'removed'
+            if changed:
+                change_counters(
+                    Recipe.objects.filter(pk__in=changed),
+                    delta,
+                    model.counter_field,
+                )
+        statuses = dict.fromkeys(changed, done)
+        rest = [pk for pk in recipe_ids if pk not in statuses]
+        if rest and request.method == 'POST':
+            statuses.update(
+                dict.fromkeys(
+                    Recipe.objects.filter(pk__in=rest).values_list(
+                        'pk', flat=True
+                    ),
+                    'already_added',
+                )
             )
-        filename = 'shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        results = [
+            {'recipe': pk, 'status': statuses.get(pk, 'not_found')}
+            for pk in recipe_ids
+        ]
+        return changed, Response({'results': results})
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorites-bulk',
+    )
+    def favorites_bulk(self, request: Request) -> Response:
+        """Добавляет/удаляет список рецептов в `избранное`."""
+        _, response = self.bulk_change(Favorite, request)
+        return response
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+    )
+    def shopping_cart_bulk(self, request: Request) -> Response:
+        """Добавляет/удаляет список рецептов в `список покупок`."""
+        with transaction.atomic():
+            changed, response = self.bulk_change(ShoppingCart, request)
+            if changed and request.method == 'POST':
+                ShoppingListItem.objects.add_recipes(request.user.id, changed)
+            elif changed:
+                ShoppingListItem.objects.remove_recipes(
+                    request.user.id, changed
+                )
+        return response
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/clear',
+        url_name='shopping-cart-clear',
+    )
+    def clear_shopping_cart(self, request: Request) -> Response:
+        """Очищает `список покупок` пользователя."""
+        with transaction.atomic():
+            removed = ShoppingCart.objects.remove_many(request.user.id)
+            if removed:
+                change_counters(
+                    Recipe.objects.filter(pk__in=removed),
+                    -1,
+                    ShoppingCart.counter_field,
+                )
+            ShoppingListItem.objects.filter(user=request.user).delete()
+        return Response(
+            {
+                'results': [
+                    {'recipe': pk, 'status': 'removed'} for pk in removed
+                ]
+            }
+        )
+
+    @staticmethod
+    def download_shopping_list(
+        ingredients: QuerySet, renderer: BaseRenderer
+    ) -> Union[StreamingHttpResponse, Response]:
+        """Метод выгружает список покупок потоком в выбранном формате.
+
+        PDF отрисовывается целиком до начала ответа, поэтому таймаут,
+        сбой пула процессов или недоступный шрифт возвращаются
+        статусом 503.
+        """
+        rows = ingredients.values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).iterator(chunk_size=settings.BULK_BATCH_SIZE)
+        if renderer.format == PDFRenderer.format:
+            try:
+                content = iter_bytes(make_pdf(rows))
+            except PDF_ERRORS:
+                return Response(
+                    {'detail': 'Не удалось сформировать PDF, повторите позже'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={
+                        'Retry-After': str(settings.SHOPPING_LIST_PDF_TIMEOUT)
+                    },
+                )
+        else:
+            content = EXPORTERS[renderer.format](rows)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename = {filename}'
         return response
 
@@ -136,27 +540,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         permission_classes=[IsAuthenticated],
         url_path='download_shopping_cart',
+        renderer_classes=[PlainTextRenderer, CSVRenderer, PDFRenderer],
+        content_negotiation_class=FallbackContentNegotiation,
     )
-    def make_shopping_list(self, request: Request) -> HttpResponse:
-        """Метод формирует список покупок."""
-        ingredients = (
-            IngredientRecipe.objects.filter(
-                recipe__shopping_cart__user=request.user
-            )
-            .order_by('ingredient__name')
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(amount=Sum('amount'))
+    def make_shopping_list(
+        self, request: Request
+    ) -> Union[StreamingHttpResponse, Response]:
+        """Метод формирует список покупок в формате txt, csv или pdf."""
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name')
+        return self.download_shopping_list(
+            ingredients, request.accepted_renderer
         )
-        return self.download_shopping_list(ingredients)
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ProfiledViewMixin, DjoserUserViewSet):
     """ViewSet для работы с пользователми."""
 
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = (IsAuthenticated,)
-    pagination_class = CustomPagination
+    pagination_class = SwitchablePagination
+    cursor_ordering = ('-date_joined', '-id')
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     http_method_names = ['patch', 'get', 'post', 'delete']
@@ -181,6 +587,16 @@ class UserViewSet(DjoserUserViewSet):
         serializer = self.get_serializer(request.user, many=False)
         return Response(serializer.data)
 
+    @staticmethod
+    def count_follow(user: User, author: User, delta: int) -> None:
+        """Метод изменяет счётчики подписок обоих пользователей."""
+        change_counters(
+            User.objects.filter(pk=user.id), delta, 'following_count'
+        )
+        change_counters(
+            User.objects.filter(pk=author.id), delta, 'followers_count'
+        )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -198,9 +614,15 @@ class UserViewSet(DjoserUserViewSet):
             serializer.is_valid(raise_exception=True)
             user = serializer.validated_data.get('user')
             author = serializer.validated_data.get('author')
-            Follow.objects.create(user=user, author=author)
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+                self.count_follow(user, author, 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        get_object_or_404(Follow, user=request.user, author=author).delete()
+        with transaction.atomic():
+            get_object_or_404(
+                Follow, user=request.user, author=author
+            ).delete()
+            self.count_follow(request.user, author, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -210,10 +632,106 @@ class UserViewSet(DjoserUserViewSet):
         url_path='subscriptions',
     )
     def follow_list(self, request: Request) -> Response:
-        """Список подписок пользоваетеля."""
-        queryset = User.objects.filter(following__user=request.user)
+        """Список подписок пользоваетеля.
+
+        Авторы выбираются одним запросом с признаком подписки и счётчиком
+        рецептов, а их последние рецепты подгружаются одной выборкой,
+        в которой `recipes_limit` применяется оконной функцией в базе.
+        """
+        serializer = RecipesLimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        queryset = User.objects.filter(following__user=request.user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
         pages = self.paginate_queryset(queryset)
+        prefetch_related_objects(
+            pages,
+            Prefetch(
+                'recipes',
+                queryset=self.get_limited_recipes(
+                    [author.id for author in pages],
+                    serializer.validated_data.get('recipes_limit'),
+                ),
+                to_attr='limited_recipes',
+            ),
+        )
         serializer = FollowListSerializer(
             pages, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_limited_recipes(
+        author_ids: List[int], limit: Optional[int]
+    ) -> QuerySet:
+        """Метод выбирает не более `limit` последних рецептов каждого автора.
+
+        Django 3.2 не умеет фильтровать по оконным выражениям, поэтому
+        нумерация `ROW_NUMBER()` внутри автора задаётся подзапросом RawSQL.
+        """
+        queryset = Recipe.objects.order_by('-created', '-id')
+        if limit is None or not author_ids:
+            return queryset
+        quote = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(author_ids))
+        ranked = (
+            f'SELECT {quote("id")} FROM ('
+            f'SELECT {quote("id")}, ROW_NUMBER() OVER ('
+            f'PARTITION BY {quote("author_id")} '
+            f'ORDER BY {quote("created")} DESC, {quote("id")} DESC'
+            f') AS {quote("position")} '
+            f'FROM {quote(Recipe._meta.db_table)} '
+            f'WHERE {quote("author_id")} IN ({placeholders})'
+            f') {quote("ranked")} WHERE {quote("position")} <= %s'
+        )
+        return queryset.filter(id__in=RawSQL(ranked, (*author_ids, limit)))
+
+
+class JWTLoginView(ProfiledViewMixin, TokenCreateView):
+    """
+    Вход в режиме `AUTH_MODE = 'jwt'`.
+    Ответ совместим с входом по токену: `auth_token` содержит
+    токен доступа, а `refresh` - токен для его обновления.
+    """
+
+    def _action(self, serializer) -> Response:
+        """Метод выдаёт пару JWT вместо токена DRF."""
+        user = serializer.user
+        user_logged_in.send(
+            sender=user.__class__, request=self.request, user=user
+        )
+        refresh = RefreshToken.for_user(user)
+        return Response(
+            {'auth_token': str(refresh.access_token), 'refresh': str(refresh)}
+        )
+
+
+class JWTLogoutView(ProfiledViewMixin, TokenDestroyView):
+    """Выход с отзывом токена доступа и переданного токена обновления."""
+
+    def post(self, request: Request) -> Response:
+        """Метод отзывает JWT или удаляет прежний токен пользователя."""
+        if not isinstance(request.auth, Token):
+            return super().post(request)
+        deny_token(request.auth)
+        try:
+            deny_token(RefreshToken(request.data.get('refresh')))
+        except TokenError:
+            pass
+        user_logged_out.send(
+            sender=request.user.__class__, request=request, user=request.user
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class JWTRefreshView(ProfiledViewMixin, APIView):
+    """Выдаёт новый токен доступа по токену обновления."""
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def post(self, request: Request) -> Response:
+        """Метод проверяет токен обновления и выдаёт новый токен доступа."""
+        serializer = TokenRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.data)
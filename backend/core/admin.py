@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from .models import RevokedToken, SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = (
+        'sql',
+        'count',
+        'total_time',
+        'max_time',
+        'view',
+        'last_seen',
+    )
+    list_filter = ('view',)
+    search_fields = ('sql', 'call_site')
+    readonly_fields = (
+        'fingerprint',
+        'sql',
+        'example',
+        'params',
+        'view',
+        'call_site',
+        'count',
+        'total_time',
+        'max_time',
+        'explain',
+        'first_seen',
+        'last_seen',
+    )
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'expires')
+    readonly_fields = ('jti', 'expires')
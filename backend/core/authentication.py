@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from core.models import RevokedToken
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework_simplejwt import authentication, tokens
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# Поля пользователя, которые переносятся в токен и позволяют собрать
+# `request.user` для чтения без запроса к базе.
+USER_CLAIMS = (
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'is_staff',
+    'is_superuser',
+)
+
+
+def add_user_claims(token: tokens.Token, user: User) -> tokens.Token:
+    for field in USER_CLAIMS:
+        token[field] = getattr(user, field)
+    return token
+
+
+class AccessToken(tokens.AccessToken):
+    """Короткоживущий токен доступа с данными пользователя."""
+
+    @classmethod
+    def for_user(cls, user: User) -> tokens.Token:
+        return add_user_claims(super().for_user(user), user)
+
+
+class RefreshToken(tokens.RefreshToken):
+    """Токен обновления, выпускающий `AccessToken` с данными пользователя."""
+
+    access_token_class = AccessToken
+
+    @classmethod
+    def for_user(cls, user: User) -> tokens.Token:
+        return add_user_claims(super().for_user(user), user)
+
+
+def deny_key(token: tokens.Token) -> str:
+    return f'jwt:deny:{token[api_settings.JTI_CLAIM]}'
+
+
+def deny_token(token: tokens.Token) -> None:
+    """
+    Отзывает токен до истечения его срока действия: запись в базе
+    хранит отзыв надёжно, запись в кеше проверяется без запроса к базе.
+    """
+    expires = datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+    timeout = (expires - datetime.now(tz=timezone.utc)).total_seconds()
+    if timeout <= 0:
+        return
+    RevokedToken.objects.revoke(token[api_settings.JTI_CLAIM], expires)
+    cache.set(deny_key(token), True, timeout=int(timeout) + 1)
+
+
+def is_denied(token: tokens.Token, check_database: bool = True) -> bool:
+    """
+    Отозван ли токен. Без `check_database` проверяется только кеш:
+    если запись из него вытеснена, отзыв не будет замечен.
+    """
+    if cache.get(deny_key(token), False):
+        return True
+    if not check_database:
+        return False
+    return RevokedToken.objects.is_revoked(token[api_settings.JTI_CLAIM])
+
+
+def user_from_claims(token: tokens.Token) -> User:
+    """Собирает несохраняемого пользователя из данных токена."""
+    try:
+        user = User(
+            pk=token[api_settings.USER_ID_CLAIM],
+            is_active=True,
+            **{field: token[field] for field in USER_CLAIMS},
+        )
+    except KeyError:
+        raise InvalidToken('Токен не содержит данных пользователя')
+    user._state.adding = False
+    return user
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя для чтения.
+    Отзыв токена для чтения проверяется по общему кешу.
+    Безопасные запросы получают пользователя из данных токена,
+    остальные загружают его из базы и проверяют, что он активен.
+    Токены другого формата пропускаются для `TokenAuthentication`.
+    """
+
+    def authenticate(
+        self, request: Request
+    ) -> Optional[Tuple[User, tokens.Token]]:
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None or raw_token.count(b'.') != 2:
+            return None
+        token = self.get_validated_token(raw_token)
+        # Чтение с общим кешем проверяет отзыв только по кешу, изменения
+        # и запросы без общего кеша - ещё и по базе.
+        check_database = (
+            request.method not in SAFE_METHODS or not settings.SHARED_CACHE
+        )
+        if is_denied(token, check_database):
+            raise InvalidToken('Токен отозван')
+        if request.method in SAFE_METHODS:
+            return user_from_claims(token), token
+        return self.get_user(token), token
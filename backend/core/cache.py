@@ -0,0 +1,71 @@
+from threading import Lock
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class RepresentationCache:
+    """
+    Кеш не зависящих от пользователя представлений объектов.
+    Значение хранится вместе с отметкой версии объекта,
+    при несовпадении отметки запись считается промахом.
+    Счётчики попаданий и промахов ведутся в пределах процесса.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.REPRESENTATION_CACHE_ENABLED
+
+    def make_key(self, pk: int) -> str:
+        return f'{self.prefix}:repr:{pk}'
+
+    def get_many(self, stamps: Dict[int, tuple]) -> Dict[int, dict]:
+        """Возвращает найденные представления с актуальными отметками."""
+        keys = {self.make_key(pk): pk for pk in stamps}
+        found = {}
+        for key, (stamp, data) in cache.get_many(keys).items():
+            pk = keys[key]
+            if stamp == stamps[pk]:
+                found[pk] = data
+        self.count(hits=len(found), misses=len(stamps) - len(found))
+        return found
+
+    def set_many(
+        self, items: Dict[int, dict], stamps: Dict[int, tuple]
+    ) -> None:
+        """Сохраняет представления вместе с отметками версий."""
+        cache.set_many(
+            {
+                self.make_key(pk): (stamps[pk], data)
+                for pk, data in items.items()
+            },
+            settings.REPRESENTATION_CACHE_TIMEOUT,
+        )
+
+    def invalidate(self, pks: Iterable[int]) -> None:
+        """Удаляет представления перечисленных объектов."""
+        cache.delete_many([self.make_key(pk) for pk in pks])
+
+    def count(self, hits: int = 0, misses: int = 0) -> None:
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает счётчики попаданий и промахов процесса."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'ratio': self.hits / total if total else 0.0,
+        }
+
+
+recipe_cache = RepresentationCache('recipe')
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Callable, List, Optional
+
+from core.models import Version
+from core.renderers import ORJSONRenderer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import Ingredient, Tag
+
+CATALOG_VERSION = 'catalog'
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version() -> int:
+    """
+    Возвращает текущую версию каталога ингредиентов и тегов.
+    Версия хранится в базе и кешируется на `CATALOG_VERSION_TIMEOUT`
+    секунд, поэтому процесс с локальным кешем видит чужое изменение
+    не позже чем через это время, а с общим кешем - сразу.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = Version.objects.get_value(CATALOG_VERSION)
+        cache.set(
+            CATALOG_VERSION_KEY, version, settings.CATALOG_VERSION_TIMEOUT
+        )
+    return version
+
+
+def bump_catalog_version() -> None:
+    """Помечает каталог изменённым для всех процессов."""
+    Version.objects.bump(CATALOG_VERSION)
+    transaction.on_commit(lambda: cache.delete(CATALOG_VERSION_KEY))
+
+
+class IngredientIndex:
+    """
+    Отсортированный индекс ингредиентов для автодополнения.
+    Названия приводятся к нижнему регистру через `casefold`,
+    совпадения по началу названия идут раньше совпадений по подстроке.
+    """
+
+    def __init__(self, ingredients: List[dict]) -> None:
+        self.entries = sorted(
+            ((item['name'].casefold(), item) for item in ingredients),
+            key=lambda entry: entry[0],
+        )
+        self.keys = [key for key, _ in self.entries]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        """Ищет ингредиенты по началу названия, затем по подстроке."""
+        query = query.casefold()
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(0x10FFFF), lo=start)
+        result = [item for _, item in self.entries[start:end]]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        result.extend(
+            item
+            for key, item in self.entries
+            if query in key and not key.startswith(query)
+        )
+        return result[:limit]
+
+
+class CatalogSnapshot:
+    """
+    Предварительно сериализованный каталог тегов и ингредиентов.
+    Хранит JSON, его сжатую версию и хеш содержимого для `ETag`.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.compressed = gzip.compress(content, mtime=0)
+        self.hash = hashlib.sha256(content).hexdigest()[:32]
+
+    @classmethod
+    def build(cls) -> 'CatalogSnapshot':
+        """Собирает снимок каталога из базы данных."""
+        return cls(
+            ORJSONRenderer().render(
+                {
+                    'tags': list(
+                        Tag.objects.values('id', 'name', 'color', 'slug')
+                    ),
+                    'ingredients': list(
+                        Ingredient.objects.values(
+                            'id', 'name', 'measurement_unit'
+                        )
+                    ),
+                }
+            )
+        )
+
+
+class CatalogValue:
+    """Хранит значение каталога в процессе и пересобирает его по версии."""
+
+    def __init__(self, builder: Callable[[], Any]) -> None:
+        self.builder = builder
+        self.value: Any = None
+        self.version: Optional[int] = None
+        self.lock = Lock()
+
+    def get(self) -> Any:
+        """Возвращает актуальное значение, собирая его при необходимости."""
+        version = get_catalog_version()
+        if self.value is None or self.version != version:
+            with self.lock:
+                if self.value is None or self.version != version:
+                    self.value = self.builder()
+                    self.version = version
+        return self.value
+
+
+ingredient_index = CatalogValue(
+    lambda: IngredientIndex(
+        list(Ingredient.objects.values('id', 'name', 'measurement_unit'))
+    )
+)
+
+catalog_snapshot = CatalogValue(CatalogSnapshot.build)
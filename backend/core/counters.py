@@ -0,0 +1,90 @@
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, Tuple
+
+from django.db import models
+from django.db.models import Count, F, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+Counters = Dict[str, Tuple[models.Model, str]]
+
+RECIPE_COUNTERS: Counters = {
+    'favorites_count': (Favorite, 'recipe'),
+    'in_carts_count': (ShoppingCart, 'recipe'),
+}
+USER_COUNTERS: Counters = {
+    'recipes_count': (Recipe, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def change_counters(queryset: QuerySet, delta: int, *fields: str) -> int:
+    """
+    Изменяет счётчики одним UPDATE через F-выражения.
+    Значение не опускается ниже нуля даже при рассогласовании.
+    """
+    return queryset.update(
+        **{field: Greatest(F(field) + delta, 0) for field in fields}
+    )
+
+
+def count_subquery(model: models.Model, lookup: str) -> Coalesce:
+    """Подзапрос с числом связанных строк для каждого объекта выборки."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{lookup: OuterRef('pk')})
+            .order_by()
+            .values(lookup)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def find_drift(queryset: QuerySet, counters: Counters) -> QuerySet:
+    """Возвращает объекты, чьи счётчики расходятся со связями."""
+    expected = {
+        f'expected_{field}': count_subquery(*source)
+        for field, source in counters.items()
+    }
+    return queryset.annotate(**expected).filter(
+        reduce(
+            or_,
+            (~Q(**{field: F(f'expected_{field}')}) for field in counters),
+        )
+    )
+
+
+def reconcile(
+    queryset: QuerySet, counters: Counters, dry_run: bool = False
+) -> int:
+    """Пересчитывает разошедшиеся счётчики и возвращает их количество."""
+    drifted = list(find_drift(queryset, counters).values_list('pk', flat=True))
+    if drifted and not dry_run:
+        queryset.model.objects.filter(pk__in=drifted).update(
+            **{
+                field: count_subquery(*source)
+                for field, source in counters.items()
+            }
+        )
+    return len(drifted)
+
+
+def reconcile_recipes(pks: Iterable[int] = None) -> int:
+    """Пересчитывает счётчики рецептов, при pks только указанных."""
+    queryset = Recipe.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=list(pks))
+    return reconcile(queryset, RECIPE_COUNTERS)
+
+
+def reconcile_users(pks: Iterable[int] = None) -> int:
+    """Пересчитывает счётчики пользователей, при pks только указанных."""
+    queryset = User.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=list(pks))
+    return reconcile(queryset, USER_COUNTERS)
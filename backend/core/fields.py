@@ -0,0 +1,110 @@
+from typing import Any, Iterable, Optional
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model
+from django.utils.encoding import smart_str
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    SlugRelatedField,
+)
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список связанных объектов, загружаемых одним запросом."""
+
+    def to_internal_value(self, data: Any) -> list:
+        if isinstance(data, (list, tuple)):
+            self.child_relation.resolve(data)
+        return super().to_internal_value(data)
+
+
+class BulkRelatedFieldMixin:
+    """
+    Поле связи, которое ищет объекты в заранее загруженном словаре.
+    `resolve` получает все значения сразу и загружает объекты одним
+    запросом `IN`, после чего `to_internal_value` не ходит в базу.
+    Без `resolve` поле работает как обычное поле DRF.
+    Ошибки по умолчанию совпадают с `PrimaryKeyRelatedField`.
+    """
+
+    lookup_field = 'pk'
+    resolved: Optional[dict] = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs) -> BulkManyRelatedField:
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_key(self, data: Any) -> Any:
+        """Приводит значение к типу поля модели или бросает ValueError."""
+        if isinstance(data, bool):
+            raise TypeError
+        opts = self.get_queryset().model._meta
+        field = (
+            opts.pk
+            if self.lookup_field == 'pk'
+            else opts.get_field(self.lookup_field)
+        )
+        try:
+            return field.to_python(data)
+        except DjangoValidationError:
+            raise ValueError
+
+    def resolve(self, values: Iterable[Any]) -> None:
+        """Загружает объекты для всех корректных значений одним запросом."""
+        keys = set()
+        for value in values:
+            try:
+                keys.add(self.to_key(value))
+            except (TypeError, ValueError):
+                continue
+        keys.discard(None)
+        self.resolved = self.get_queryset().in_bulk(
+            keys, field_name=self.lookup_field
+        )
+
+    def fail_invalid(self, data: Any) -> None:
+        """Ошибка для значения, которое нельзя привести к ключу."""
+        self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def fail_missing(self, data: Any) -> None:
+        """Ошибка для значения, по которому объект не найден."""
+        self.fail('does_not_exist', pk_value=data)
+
+    def to_internal_value(self, data: Any) -> Model:
+        if self.resolved is None:
+            return super().to_internal_value(data)
+        try:
+            key = self.to_key(data)
+        except (TypeError, ValueError):
+            self.fail_invalid(data)
+        if key not in self.resolved:
+            self.fail_missing(data)
+        return self.resolved[key]
+
+
+class BulkPrimaryKeyRelatedField(
+    BulkRelatedFieldMixin, PrimaryKeyRelatedField
+):
+    """`PrimaryKeyRelatedField` с загрузкой списка одним запросом."""
+
+
+class BulkSlugRelatedField(BulkRelatedFieldMixin, SlugRelatedField):
+    """`SlugRelatedField` с загрузкой списка одним запросом."""
+
+    def __init__(self, slug_field: str = None, **kwargs) -> None:
+        super().__init__(slug_field=slug_field, **kwargs)
+        self.lookup_field = slug_field
+
+    def fail_invalid(self, data: Any) -> None:
+        self.fail('invalid')
+
+    def fail_missing(self, data: Any) -> None:
+        self.fail(
+            'does_not_exist', slug_name=self.slug_field, value=smart_str(data)
+        )
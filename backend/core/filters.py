@@ -2,6 +2,8 @@ from django.db.models import Q, QuerySet
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe, Tag
 
+from .search import search_recipes
+
 
 class IngredientFilter(FilterSet):
     """Фильтр для поиска по названию ингридиента."""
@@ -30,6 +32,7 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -53,3 +56,11 @@ class RecipeFilter(FilterSet):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def filter_search(
+        self, queryset: QuerySet, name: str, value: str
+    ) -> QuerySet:
+        """Полнотекстовый поиск, более точные совпадения идут первыми"""
+        return search_recipes(queryset, value).order_by(
+            '-search_rank', '-created', '-id'
+        )
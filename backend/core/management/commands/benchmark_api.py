@@ -0,0 +1,689 @@
+import json
+import shutil
+import tempfile
+from collections import Counter
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from colorama import Fore
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, reverse
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+from .generate_fake_data import PASSWORD
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+NEW_PASSWORD = 'fake-password-changed'
+
+# Маршруты djoser для активации и сброса учётных данных по почте
+# и имена, перекрытые одноимёнными маршрутами роутера `users`.
+# Обновление JWT есть только в режиме `AUTH_MODE = 'jwt'`.
+SKIPPED_ROUTES = {
+    'api-root',
+    'token-refresh',
+    'users-activation',
+    'users-resend-activation',
+    'users-reset-password',
+    'users-reset-password-confirm',
+    'users-reset-username',
+    'users-reset-username-confirm',
+    'users-set-username',
+    'users-me',
+    'user-list',
+    'user-activation',
+    'user-me',
+    'user-resend-activation',
+    'user-reset-password',
+    'user-reset-password-confirm',
+    'user-reset-username',
+    'user-reset-username-confirm',
+    'user-set-password',
+    'user-set-username',
+    'user-detail',
+}
+
+Context = Dict[str, object]
+
+
+class Case(NamedTuple):
+    """Замер одного запроса с бюджетами запросов к базе и времени."""
+
+    name: str
+    route: str
+    method: str = 'get'
+    auth: Optional[str] = None
+    kwargs: Callable[[Context], dict] = lambda ctx: {}
+    query: str = ''
+    data: Optional[Callable[[Context], dict]] = None
+    status: int = 200
+    max_queries: int = 10
+    max_ms: float = 100
+    store: Optional[Callable[[Context, object], None]] = None
+
+
+def recipe_data(ctx: Context) -> dict:
+    return {
+        'tags': ctx['tag_ids'],
+        'ingredients': [
+            {'id': pk, 'amount': 10 + index}
+            for index, pk in enumerate(ctx['ingredient_ids'])
+        ],
+        'name': f'Рецепт для замера {ctx["iteration"]}',
+        'image': IMAGE,
+        'text': 'Описание',
+        'cooking_time': 15,
+    }
+
+
+def store_value(key: str, field: str) -> Callable[[Context, object], None]:
+    def store(ctx: Context, response) -> None:
+        ctx[key] = response.json()[field]
+
+    return store
+
+
+CASES = (
+    Case('catalog', 'catalog', max_queries=0, max_ms=50),
+    Case('metrics', 'metrics', max_queries=0, max_ms=50),
+    Case(
+        'catalog version',
+        'catalog-version',
+        kwargs=lambda ctx: {'content_hash': ctx['catalog_hash']},
+        max_queries=0,
+        max_ms=50,
+    ),
+    Case('tags', 'tags-list', max_queries=1, max_ms=30),
+    Case(
+        'tag',
+        'tags-detail',
+        kwargs=lambda ctx: {'pk': ctx['tag_ids'][0]},
+        max_queries=1,
+        max_ms=30,
+    ),
+    Case('ingredients', 'ingredients-list', max_queries=1, max_ms=300),
+    Case(
+        'ingredients search',
+        'ingredients-list',
+        query='name=соль',
+        max_queries=0,
+        max_ms=30,
+    ),
+    Case(
+        'ingredient',
+        'ingredients-detail',
+        kwargs=lambda ctx: {'pk': ctx['ingredient_ids'][0]},
+        max_queries=1,
+        max_ms=30,
+    ),
+    Case('recipes', 'recipes-list', max_queries=5, max_ms=150),
+    Case(
+        'recipes page',
+        'recipes-list',
+        query='limit=50&page=2',
+        max_queries=5,
+        max_ms=400,
+    ),
+    Case(
+        'recipes cursor',
+        'recipes-list',
+        query='pagination=cursor&limit=50',
+        max_queries=4,
+        max_ms=400,
+    ),
+    Case(
+        'recipes filtered',
+        'recipes-list',
+        query='tags=breakfast&tags=lunch',
+        max_queries=6,
+        max_ms=200,
+    ),
+    Case(
+        'recipes search',
+        'recipes-list',
+        query='search=домашний суп&tags=breakfast',
+        max_queries=7,
+        max_ms=200,
+    ),
+    Case(
+        'recipes',
+        'recipes-list',
+        auth='user',
+        max_queries=6,
+        max_ms=150,
+    ),
+    Case(
+        'recipes favorited',
+        'recipes-list',
+        auth='user',
+        query='is_favorited=1&limit=50',
+        max_queries=6,
+        max_ms=300,
+    ),
+    Case(
+        'recipes in cart',
+        'recipes-list',
+        auth='user',
+        query='is_in_shopping_cart=1',
+        max_queries=6,
+        max_ms=200,
+    ),
+    Case(
+        'recipes by author',
+        'recipes-list',
+        auth='user',
+        query='author={author_id}',
+        max_queries=7,
+        max_ms=200,
+    ),
+    Case(
+        'recipe',
+        'recipes-detail',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        max_queries=4,
+        max_ms=50,
+    ),
+    Case(
+        'recipe',
+        'recipes-detail',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        max_queries=4,
+        max_ms=80,
+    ),
+    Case(
+        'recipe create',
+        'recipes-list',
+        method='post',
+        auth='user',
+        data=recipe_data,
+        status=201,
+        max_queries=24,
+        max_ms=200,
+        store=store_value('new_recipe_id', 'id'),
+    ),
+    Case(
+        'recipe update',
+        'recipes-detail',
+        method='patch',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['new_recipe_id']},
+        data=recipe_data,
+        max_queries=25,
+        max_ms=200,
+    ),
+    Case(
+        'recipe delete',
+        'recipes-detail',
+        method='delete',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['new_recipe_id']},
+        status=204,
+        max_queries=14,
+        max_ms=150,
+    ),
+    Case(
+        'favorite add',
+        'recipes-favorites',
+        method='post',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        status=201,
+        max_queries=7,
+        max_ms=100,
+    ),
+    Case(
+        'favorite remove',
+        'recipes-favorites',
+        method='delete',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        status=204,
+        max_queries=5,
+        max_ms=100,
+    ),
+    Case(
+        'cart add',
+        'recipes-shopping-cart',
+        method='post',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        status=201,
+        max_queries=15,
+        max_ms=150,
+    ),
+    Case(
+        'cart remove',
+        'recipes-shopping-cart',
+        method='delete',
+        auth='user',
+        kwargs=lambda ctx: {'pk': ctx['recipe_id']},
+        status=204,
+        max_queries=12,
+        max_ms=100,
+    ),
+    Case(
+        'favorites bulk add',
+        'recipes-favorites-bulk',
+        method='post',
+        auth='other',
+        data=lambda ctx: {'recipes': ctx['bulk_ids']},
+        max_queries=6,
+        max_ms=100,
+    ),
+    Case(
+        'favorites bulk remove',
+        'recipes-favorites-bulk',
+        method='delete',
+        auth='other',
+        data=lambda ctx: {'recipes': ctx['bulk_ids']},
+        max_queries=5,
+        max_ms=100,
+    ),
+    Case(
+        'cart bulk add',
+        'recipes-shopping-cart-bulk',
+        method='post',
+        auth='other',
+        data=lambda ctx: {'recipes': ctx['bulk_ids']},
+        max_queries=14,
+        max_ms=150,
+    ),
+    Case(
+        'cart bulk remove',
+        'recipes-shopping-cart-bulk',
+        method='delete',
+        auth='other',
+        data=lambda ctx: {'recipes': ctx['bulk_ids'][::2]},
+        max_queries=12,
+        max_ms=150,
+    ),
+    Case(
+        'cart clear',
+        'recipes-shopping-cart-clear',
+        method='post',
+        auth='other',
+        max_queries=8,
+        max_ms=150,
+    ),
+    Case(
+        'shopping list',
+        'recipes-make-shopping-list',
+        auth='user',
+        max_queries=1,
+        max_ms=100,
+    ),
+    Case(
+        'shopping list csv',
+        'recipes-make-shopping-list',
+        auth='user',
+        query='format=csv',
+        max_queries=1,
+        max_ms=100,
+    ),
+    Case('users', 'users-list', max_queries=2, max_ms=50),
+    Case(
+        'user register',
+        'users-list',
+        method='post',
+        data=lambda ctx: {
+            'email': f'bench{ctx["iteration"]}@example.com',
+            'username': f'bench{ctx["iteration"]}',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': PASSWORD,
+        },
+        status=201,
+        max_queries=5,
+        max_ms=1000,
+    ),
+    Case(
+        'user',
+        'users-detail',
+        auth='user',
+        kwargs=lambda ctx: {'id': ctx['author_id']},
+        max_queries=2,
+        max_ms=50,
+    ),
+    Case(
+        'me',
+        'users-get-or-update-self',
+        auth='user',
+        max_queries=1,
+        max_ms=50,
+    ),
+    Case(
+        'subscriptions',
+        'users-follow-list',
+        auth='user',
+        query='recipes_limit=3',
+        max_queries=3,
+        max_ms=150,
+    ),
+    Case(
+        'subscribe',
+        'users-follow',
+        method='post',
+        auth='user',
+        kwargs=lambda ctx: {'id': ctx['unfollowed_id']},
+        status=201,
+        max_queries=8,
+        max_ms=50,
+    ),
+    Case(
+        'unsubscribe',
+        'users-follow',
+        method='delete',
+        auth='user',
+        kwargs=lambda ctx: {'id': ctx['unfollowed_id']},
+        status=204,
+        max_queries=6,
+        max_ms=50,
+    ),
+    Case(
+        'set password',
+        'users-set-password',
+        method='post',
+        auth='other',
+        data=lambda ctx: {
+            'current_password': PASSWORD,
+            'new_password': NEW_PASSWORD,
+        },
+        status=204,
+        max_queries=3,
+        max_ms=1000,
+    ),
+    Case(
+        'set password back',
+        'users-set-password',
+        method='post',
+        auth='other',
+        data=lambda ctx: {
+            'current_password': NEW_PASSWORD,
+            'new_password': PASSWORD,
+        },
+        status=204,
+        max_queries=3,
+        max_ms=1000,
+    ),
+    Case(
+        'login',
+        'login',
+        method='post',
+        data=lambda ctx: {'email': ctx['other_email'], 'password': PASSWORD},
+        max_queries=5,
+        max_ms=1000,
+        store=store_value('token', 'auth_token'),
+    ),
+    Case(
+        'logout',
+        'logout',
+        method='post',
+        auth='token',
+        status=204,
+        max_queries=3,
+        max_ms=100,
+    ),
+)
+
+
+def route_names(patterns: list) -> Set[str]:
+    """Собирает имена всех маршрутов из списка шаблонов URL."""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def content_length(response) -> int:
+    """Размер тела ответа, в том числе потокового."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    """Замеряет маршруты API на тестовой базе с фиксированными данными.
+
+    Для каждого маршрута из `api/urls.py` снимаются p50/p95 времени
+    ответа, число запросов к базе и размер ответа. Результат пишется
+    в JSON, превышение бюджета или числа запросов из базовой линии
+    завершает команду ошибкой.
+
+    Замер идёт с настройками проекта, бюджеты рассчитаны на настройки
+    по умолчанию. С бюджетом сравнивается самое частое число запросов:
+    версия каталога перечитывается из базы раз в
+    CATALOG_VERSION_TIMEOUT секунд на процесс и добавляет запрос
+    случайному замеру. Максимум пишется в `queries_max`.
+    """
+
+    help = 'Benchmarks API routes against query and latency budgets'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output',
+            default='api_benchmark.json',
+            help='Where to write the JSON results',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Previous results; more queries than there is a failure',
+        )
+        parser.add_argument(
+            '--latency-scale',
+            type=float,
+            default=1.0,
+            help='Multiplier for latency budgets on slow machines',
+        )
+
+    def handle(self, *args, **options) -> None:
+        from api import urls
+
+        missing = (
+            route_names(urls.urlpatterns)
+            - {case.route for case in CASES}
+            - SKIPPED_ROUTES
+        )
+        if missing:
+            raise CommandError(
+                f'Routes without benchmark cases: {", ".join(sorted(missing))}'
+            )
+        media_root = tempfile.mkdtemp()
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={'default'}
+        )
+        try:
+            self.stdout.write(
+                f'Cache: {settings.CACHES["default"]["BACKEND"]}, '
+                f'representation cache: '
+                f'{"on" if settings.REPRESENTATION_CACHE_ENABLED else "off"}'
+            )
+            with override_settings(MEDIA_ROOT=media_root):
+                cache.clear()
+                ctx = self.seed(options)
+                results = self.run_cases(ctx, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            Fore.BLUE + f'Results written to {options["output"]}'
+        )
+        failures = self.find_failures(results, options)
+        if failures:
+            raise CommandError(
+                'Benchmark budgets exceeded:\n' + '\n'.join(failures)
+            )
+        self.stdout.write(Fore.GREEN + 'All routes are within budget')
+
+    def seed(self, options: dict) -> Context:
+        """Заполняет тестовую базу и выбирает объекты для запросов."""
+        call_command('csv_to_db', verbosity=0, stdout=self.stdout)
+        call_command(
+            'generate_fake_data',
+            users=options['users'],
+            recipes=options['recipes'],
+            seed=options['seed'],
+            stdout=self.stdout,
+        )
+        user = User.objects.order_by('-following_count', 'id').first()
+        other = User.objects.exclude(pk=user.pk).order_by('id').first()
+        recipe = Recipe.objects.exclude(favorites__user=user).exclude(
+            shopping_cart__user=user
+        )[0]
+        bulk_ids = list(
+            Recipe.objects.exclude(favorites__user=other)
+            .exclude(shopping_cart__user=other)
+            .values_list('id', flat=True)[:20]
+        )
+        unfollowed = (
+            User.objects.exclude(pk=user.pk)
+            .exclude(following__user=user)
+            .order_by('id')
+            .first()
+        )
+        ctx = {
+            'user': user,
+            'other': other,
+            'other_email': other.email,
+            'recipe_id': recipe.id,
+            'bulk_ids': bulk_ids,
+            'author_id': recipe.author_id,
+            'unfollowed_id': unfollowed.id,
+            'tag_ids': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredient_ids': list(
+                Ingredient.objects.values_list('id', flat=True)[:5]
+            ),
+        }
+        response = APIClient().get(reverse('catalog'))
+        ctx['catalog_hash'] = (
+            response['Content-Location'].rstrip('/').split('/')[-1]
+        )
+        return ctx
+
+    @staticmethod
+    def get_client(ctx: Context, auth: Optional[str]) -> APIClient:
+        client = APIClient()
+        if auth == 'token':
+            client.credentials(HTTP_AUTHORIZATION=f'Token {ctx["token"]}')
+        elif auth is not None:
+            client.force_authenticate(ctx[auth])
+        return client
+
+    def request(self, ctx: Context, case: Case):
+        """Выполняет запрос и возвращает ответ, время и число запросов."""
+        client = self.get_client(ctx, case.auth)
+        url = reverse(case.route, kwargs=case.kwargs(ctx))
+        if case.query:
+            url += '?' + case.query.format(**ctx)
+        data = case.data(ctx) if case.data else None
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = getattr(client, case.method)(url, data, format='json')
+            size = content_length(response)
+            elapsed = (perf_counter() - started) * 1000
+        if response.status_code != case.status:
+            raise CommandError(
+                f'{case.method.upper()} {url} returned '
+                f'{response.status_code} instead of {case.status}: '
+                f'{response.content[:300] if not response.streaming else ""}'
+            )
+        if case.store:
+            case.store(ctx, response)
+        return elapsed, len(queries), size
+
+    def run_cases(self, ctx: Context, options: dict) -> Dict[str, dict]:
+        """Прогоняет все сценарии и собирает статистику по каждому."""
+        samples = {self.key(case): [] for case in CASES}
+        total = options['warmup'] + options['iterations']
+        for iteration in range(total):
+            ctx['iteration'] = iteration
+            for case in CASES:
+                measure = self.request(ctx, case)
+                if iteration >= options['warmup']:
+                    samples[self.key(case)].append(measure)
+        results = {}
+        for case in CASES:
+            measures = samples[self.key(case)]
+            times = [elapsed for elapsed, _, _ in measures]
+            counts = Counter(queries for _, queries, _ in measures)
+            result = results[self.key(case)] = {
+                'route': case.route,
+                'p50_ms': round(percentile(times, 0.5), 2),
+                'p95_ms': round(percentile(times, 0.95), 2),
+                'queries': counts.most_common(1)[0][0],
+                'queries_max': max(counts),
+                'bytes': max(size for _, _, size in measures),
+                'max_queries': case.max_queries,
+                'max_ms': case.max_ms * options['latency_scale'],
+            }
+            self.stdout.write(
+                f'{self.key(case):<45} p50={result["p50_ms"]:>8} '
+                f'p95={result["p95_ms"]:>8} q={result["queries"]:>3} '
+                f'bytes={result["bytes"]}'
+            )
+        return results
+
+    @staticmethod
+    def key(case: Case) -> str:
+        return f'{case.method.upper()} {case.name} ({case.auth or "anon"})'
+
+    @staticmethod
+    def find_failures(results: Dict[str, dict], options: dict) -> List[str]:
+        """Сравнивает результаты с бюджетами и базовой линией."""
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        failures = []
+        for key, result in results.items():
+            if result['queries'] > result['max_queries']:
+                failures.append(
+                    f'{key}: {result["queries"]} queries, '
+                    f'budget {result["max_queries"]}'
+                )
+            if result['p95_ms'] > result['max_ms']:
+                failures.append(
+                    f'{key}: p95 {result["p95_ms"]} ms, '
+                    f'budget {result["max_ms"]} ms'
+                )
+            previous = baseline.get(key)
+            if previous and result['queries'] > previous['queries']:
+                failures.append(
+                    f'{key}: {result["queries"]} queries, '
+                    f'baseline {previous["queries"]}'
+                )
+        return failures
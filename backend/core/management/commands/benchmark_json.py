@@ -0,0 +1,88 @@
+import tracemalloc
+from statistics import median
+from time import perf_counter
+from typing import Tuple
+
+from api.serializers import RecipeReadSerializer
+from colorama import Fore
+from core.renderers import ORJSONRenderer, orjson
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from recipes.models import Recipe
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+def measure(
+    renderer: BaseRenderer, data: list, repeat: int
+) -> Tuple[bytes, float, int]:
+    """Возвращает вывод, медиану времени в мс и пик памяти в байтах."""
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        content = renderer.render(data)
+        timings.append((perf_counter() - started) * 1000)
+    tracemalloc.start()
+    renderer.render(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return content, median(timings), peak
+
+
+class Command(BaseCommand):
+    """Сравнивает JSONRenderer и ORJSONRenderer на странице рецептов."""
+
+    help = 'Benchmarks JSON rendering of a full RecipeReadSerializer page'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='Number of recipes on the rendered page',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Number of renders per renderer',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if orjson is None:
+            raise CommandError('orjson is not installed')
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.all()[: options['page_size']]
+        data = RecipeReadSerializer(
+            recipes, many=True, context={'request': request}
+        ).data
+        if not data:
+            raise CommandError(
+                'No recipes to render, run generate_fake_data first'
+            )
+        self.stdout.write(
+            Fore.BLUE + f'Rendering {len(data)} recipes '
+            f'{options["repeat"]} times'
+        )
+        results = {}
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            name = type(renderer).__name__
+            results[name] = measure(renderer, data, options['repeat'])
+            content, elapsed, peak = results[name]
+            self.stdout.write(
+                f'{name:<16} {elapsed:8.2f} ms '
+                f'peak {peak / 1024:8.1f} KiB '
+                f'{len(content) / 1024:8.1f} KiB output'
+            )
+        expected, base_time, base_peak = results['JSONRenderer']
+        content, fast_time, fast_peak = results['ORJSONRenderer']
+        if content != expected:
+            raise CommandError(
+                'ORJSONRenderer output differs from JSONRenderer'
+            )
+        self.stdout.write(
+            Fore.GREEN + f'Identical output, {base_time / fast_time:.1f}x '
+            f'faster, {base_peak / max(fast_peak, 1):.1f}x less peak memory'
+        )
@@ -0,0 +1,175 @@
+import re
+from typing import Callable, List, NamedTuple, Tuple
+
+from colorama import Fore
+from core.search import search_recipes
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, Model, OuterRef, QuerySet
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    TagRecipe,
+)
+from users.models import Follow, User
+
+USER_ID = 1
+AUTHOR_ID = 2
+PAGE_SIZE = 6
+
+# Без статистики планировщик PostgreSQL выбирает полный проход по
+# маленьким таблицам, поэтому проверка запрещает его на время EXPLAIN.
+POSTGRESQL_SETTINGS = (
+    'SET LOCAL enable_seqscan = off',
+    'SET LOCAL enable_sort = off',
+)
+
+
+class PlanCase(NamedTuple):
+    """Горячий запрос и таблицы, которые он должен читать по индексу."""
+
+    name: str
+    queryset: Callable[[], QuerySet]
+    models: Tuple[Model, ...]
+    ordered: bool = False
+
+
+def recipes_with_flags() -> QuerySet:
+    return Recipe.objects.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user_id=USER_ID, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user_id=USER_ID, recipe=OuterRef('pk'))
+        ),
+        is_subscribed=Exists(
+            Follow.objects.filter(user_id=USER_ID, author=OuterRef('author'))
+        ),
+    )[:PAGE_SIZE]
+
+
+CASES = [
+    PlanCase(
+        'recipes feed',
+        lambda: Recipe.objects.order_by('-created')[:PAGE_SIZE],
+        (Recipe,),
+        ordered=True,
+    ),
+    PlanCase(
+        'recipes of author',
+        lambda: Recipe.objects.filter(author_id=AUTHOR_ID).order_by(
+            '-created'
+        )[:PAGE_SIZE],
+        (Recipe,),
+        ordered=True,
+    ),
+    PlanCase(
+        'recipes by tags',
+        lambda: Recipe.objects.filter(
+            tags__slug__in=['breakfast', 'lunch']
+        ).distinct()[:PAGE_SIZE],
+        (TagRecipe,),
+    ),
+    PlanCase(
+        'viewer flags',
+        recipes_with_flags,
+        (Favorite, ShoppingCart, Follow),
+    ),
+    PlanCase(
+        'favorited recipes',
+        lambda: Recipe.objects.filter(favorites__user_id=USER_ID),
+        (Favorite,),
+    ),
+    PlanCase(
+        'recipes in cart',
+        lambda: Recipe.objects.filter(shopping_cart__user_id=USER_ID),
+        (ShoppingCart,),
+    ),
+    PlanCase(
+        'subscriptions',
+        lambda: User.objects.filter(following__user_id=USER_ID),
+        (Follow,),
+    ),
+    PlanCase(
+        'subscribers',
+        lambda: Follow.objects.filter(author_id=AUTHOR_ID).values('user_id'),
+        (Follow,),
+    ),
+    PlanCase(
+        'ingredient prefix search',
+        lambda: Ingredient.objects.filter(name__istartswith='соль'),
+        (Ingredient,),
+    ),
+    PlanCase(
+        'recipes search',
+        lambda: search_recipes(Recipe.objects.all(), 'домашний суп'),
+        (Recipe,),
+    ),
+    PlanCase(
+        'shopping list',
+        lambda: ShoppingListItem.objects.filter(user_id=USER_ID),
+        (ShoppingListItem,),
+    ),
+]
+
+
+def find_problems(plan: str, case: PlanCase, vendor: str) -> List[str]:
+    """Находит в плане полные проходы по таблицам и лишние сортировки."""
+    problems = []
+    for model in case.models:
+        table = re.escape(model._meta.db_table)
+        if vendor == 'postgresql':
+            full_scan = re.search(rf'Seq Scan on {table}\b', plan)
+        else:
+            # Обход индекса целиком допустим только ради порядка с LIMIT.
+            suffix = r'(?! USING)' if case.ordered else ''
+            full_scan = re.search(rf'\bSCAN {table}\b{suffix}', plan)
+        if full_scan:
+            problems.append(f'full scan of {model._meta.db_table}')
+    if case.ordered:
+        if vendor == 'postgresql':
+            sort = re.search(r'(^|->)\s*Sort\s+\(', plan, re.MULTILINE)
+        else:
+            sort = 'TEMP B-TREE FOR ORDER BY' in plan
+        if sort:
+            problems.append('ordering is not served by an index')
+    return problems
+
+
+class Command(BaseCommand):
+    """Проверяет через EXPLAIN, что горячие запросы используют индексы."""
+
+    help = 'Fails when a hot query plan scans a whole table'
+
+    def explain(self, queryset: QuerySet) -> str:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    for statement in POSTGRESQL_SETTINGS:
+                        cursor.execute(statement)
+            return queryset.explain()
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(
+                f'Plans of {connection.vendor} are not supported'
+            )
+        failures = 0
+        for case in CASES:
+            plan = self.explain(case.queryset())
+            problems = find_problems(plan, case, connection.vendor)
+            if problems:
+                failures += 1
+                self.stdout.write(
+                    Fore.RED + f'{case.name}: ' + ', '.join(problems)
+                )
+            else:
+                self.stdout.write(Fore.GREEN + f'{case.name}: ok')
+            if problems or options['verbosity'] > 1:
+                self.stdout.write(plan)
+        if failures:
+            raise CommandError(f'{failures} queries do not use indexes')
+        self.stdout.write(Fore.GREEN + 'All hot queries use indexes')
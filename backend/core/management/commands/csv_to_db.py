@@ -1,38 +1,168 @@
 import csv
+import json
 import os.path
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Tuple
 
 from colorama import Fore
+from core.catalog import bump_catalog_version
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import models, transaction
 from recipes.models import Ingredient, Tag
 
 
+class Catalog(NamedTuple):
+    """Описание загружаемого справочника."""
+
+    name: str
+    model: models.Model
+    key: Tuple[str, ...]
+    fields: Tuple[str, ...]
+
+
+CATALOGS = (
+    Catalog(
+        'ingredients',
+        Ingredient,
+        ('name', 'measurement_unit'),
+        ('name', 'measurement_unit'),
+    ),
+    Catalog('tags', Tag, ('slug',), ('name', 'color', 'slug')),
+)
+
+
+class Diff(NamedTuple):
+    """Разница между файлом и таблицей справочника."""
+
+    create: List[models.Model]
+    update: List[models.Model]
+    unchanged: int
+    total: int
+
+
+def read_rows(path: str, fields: Tuple[str, ...]) -> Iterator[dict]:
+    """Построчно читает CSV без заголовка или JSON-список объектов."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            for row in json.load(f):
+                yield {field: row[field] for field in fields}
+            return
+        for row in csv.reader(f):
+            if len(row) != len(fields):
+                raise CommandError(
+                    f'{path}: expected {len(fields)} columns, got {row}'
+                )
+            yield dict(zip(fields, row))
+
+
 class Command(BaseCommand):
-    """Переносит данные из файла CSV в базу данных."""
+    """Переносит данные из файла CSV в базу данных.
+
+    Загрузка идемпотентна: строки сравниваются с таблицей по
+    естественному ключу, добавляются только новые и обновляются
+    только изменённые. Существующие строки не удаляются, поэтому
+    ингредиенты рецептов не теряют ссылок на справочник.
+    """
+
+    help = "Loads ingredients and tags from csv or json files"
 
-    help = "Loads data from csv files"
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(settings.DATA_ROOT, 'ingredients.csv'),
+            help='Path to ingredients.csv or ingredients.json',
+        )
+        parser.add_argument(
+            '--tags',
+            default=os.path.join(settings.DATA_ROOT, 'tags.csv'),
+            help='Path to tags.csv or tags.json',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BULK_BATCH_SIZE,
+            help='Rows per bulk INSERT or UPDATE statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be created and updated',
+        )
 
     def handle(self, *args, **options) -> None:
-        """Создает объекты Tag."""
-        self.stdout.write(Fore.RED + 'Clear ingredients data')
-        Ingredient.objects.all().delete()
-        self.stdout.write(Fore.BLUE + 'Trying to load ingredients data')
-        file_path = os.path.join(settings.DATA_ROOT, 'ingredients.csv')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for name, unit in reader:
-                Ingredient.objects.get_or_create(
-                    name=name, measurement_unit=unit
-                )
+        """Сравнивает справочники с файлами и применяет разницу."""
+        started = perf_counter()
+        diffs = {}
+        for catalog in CATALOGS:
             self.stdout.write(
-                Fore.GREEN + 'Ingredients data successfully uploaded'
+                Fore.BLUE + f'Trying to load {catalog.name} data'
+            )
+            diffs[catalog] = self.get_diff(catalog, options[catalog.name])
+            self.report(catalog, diffs[catalog], options['verbosity'])
+        if options['dry_run']:
+            self.stdout.write(Fore.YELLOW + 'Dry run, nothing was saved')
+            return
+        with transaction.atomic():
+            for catalog, diff in diffs.items():
+                self.apply(catalog, diff, options['batch_size'])
+        if any(diff.create or diff.update for diff in diffs.values()):
+            bump_catalog_version()
+        elapsed = perf_counter() - started
+        total = sum(diff.total for diff in diffs.values())
+        self.stdout.write(
+            Fore.GREEN + f'Catalog data successfully uploaded: {total} rows '
+            f'in {elapsed:.2f} s ({total / elapsed:.0f} rows/s)'
+        )
+
+    @staticmethod
+    def get_diff(catalog: Catalog, path: str) -> Diff:
+        """Собирает новые и изменённые строки справочника."""
+        existing: Dict[tuple, models.Model] = {
+            tuple(getattr(obj, field) for field in catalog.key): obj
+            for obj in catalog.model.objects.only(
+                'pk', *catalog.fields
+            ).iterator()
+        }
+        create, update = {}, []
+        unchanged = total = 0
+        for row in read_rows(path, catalog.fields):
+            total += 1
+            key = tuple(row[field] for field in catalog.key)
+            obj = existing.get(key)
+            if obj is None:
+                create.setdefault(key, catalog.model(**row))
+            elif any(getattr(obj, f) != v for f, v in row.items()):
+                for field, value in row.items():
+                    setattr(obj, field, value)
+                update.append(obj)
+            else:
+                unchanged += 1
+        return Diff(list(create.values()), update, unchanged, total)
+
+    def report(self, catalog: Catalog, diff: Diff, verbosity: int) -> None:
+        """Выводит сводку разницы, а при -v 2 и сами строки."""
+        self.stdout.write(
+            f'{catalog.name}: {len(diff.create)} to create, '
+            f'{len(diff.update)} to update, {diff.unchanged} unchanged'
+        )
+        if verbosity < 2:
+            return
+        for sign, objs in (('+', diff.create), ('~', diff.update)):
+            for obj in objs:
+                values = ', '.join(
+                    str(getattr(obj, field)) for field in catalog.fields
+                )
+                self.stdout.write(f'  {sign} {values}')
+
+    @staticmethod
+    def apply(catalog: Catalog, diff: Diff, batch_size: int) -> None:
+        """Применяет разницу пакетными INSERT и UPDATE."""
+        catalog.model.objects.bulk_create(
+            diff.create, batch_size=batch_size, ignore_conflicts=True
+        )
+        updated_fields = [f for f in catalog.fields if f not in catalog.key]
+        if diff.update and updated_fields:
+            catalog.model.objects.bulk_update(
+                diff.update, updated_fields, batch_size=batch_size
             )
-        self.stdout.write(Fore.RED + 'Clear tags data')
-        Tag.objects.all().delete()
-        self.stdout.write(Fore.BLUE + 'Trying to load ingredients data')
-        file_path = os.path.join(settings.DATA_ROOT, 'tags.csv')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for tag, color, slug in reader:
-                Tag.objects.get_or_create(name=tag, color=color, slug=slug)
-            self.stdout.write(Fore.GREEN + 'Tags data successfully uploaded')
@@ -0,0 +1,390 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+from time import perf_counter
+from typing import Iterable, Iterator, List, Sequence
+
+from colorama import Fore
+from core.models import RECIPES_VERSION, Version
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+    TagRecipe,
+)
+from users.models import Follow, User
+
+DISHES = (
+    'суп',
+    'салат',
+    'пирог',
+    'омлет',
+    'рагу',
+    'паста',
+    'каша',
+    'запеканка',
+    'плов',
+    'десерт',
+)
+ADJECTIVES = (
+    'домашний',
+    'быстрый',
+    'летний',
+    'пряный',
+    'сытный',
+    'лёгкий',
+    'праздничный',
+    'бабушкин',
+)
+SENTENCES = (
+    'Нарежьте ингредиенты и сложите в глубокую миску.',
+    'Разогрейте духовку до 180 градусов.',
+    'Обжарьте на среднем огне до золотистой корочки.',
+    'Посолите и поперчите по вкусу.',
+    'Подавайте горячим, посыпав зеленью.',
+    'Дайте настояться десять минут под крышкой.',
+)
+PASSWORD = 'fake-password'
+IMAGE = 'recipes/images/fake.png'
+PERIOD = timedelta(days=365)
+
+
+def zipf_weights(size: int, exponent: float = 1.1) -> List[float]:
+    """Накопленные веса распределения Ципфа для `random.choices`."""
+    return list(
+        accumulate(1 / rank**exponent for rank in range(1, size + 1))
+    )
+
+
+def pick_unique(
+    rng: random.Random,
+    population: Sequence[int],
+    cum_weights: List[float],
+    k: int,
+) -> List[int]:
+    """Выбирает k различных элементов с учётом весов."""
+    k = min(k, len(population))
+    picked = set()
+    while len(picked) < k:
+        picked.update(
+            rng.choices(population, cum_weights=cum_weights, k=k - len(picked))
+        )
+    return list(picked)
+
+
+@contextmanager
+def manual_timestamps(*models_: models.Model) -> Iterator[None]:
+    """Временно отключает auto_now и auto_now_add у моделей."""
+    fields = [
+        field
+        for model in models_
+        for field in model._meta.fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    """Заполняет базу синтетическими пользователями и рецептами.
+
+    Первичные ключи вычисляются заранее, пользователи и рецепты
+    пишутся пакетами `bulk_create`, а связующие таблицы, где строк
+    на порядки больше, — пакетным `executemany` без создания моделей.
+    Фиксированный seed делает запуски повторяемыми.
+    """
+
+    help = 'Generates deterministic fake users, recipes and relations'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=8,
+            help='Average number of ingredients in a recipe',
+        )
+        parser.add_argument(
+            '--favorites-per-user',
+            type=int,
+            default=20,
+            help='Average number of favorite recipes per user',
+        )
+        parser.add_argument(
+            '--carts-per-user',
+            type=int,
+            default=3,
+            help='Average number of recipes in a shopping cart',
+        )
+        parser.add_argument(
+            '--follows-per-user',
+            type=int,
+            default=10,
+            help='Average number of followed authors per user',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options) -> None:
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError('Load the catalog first: manage.py csv_to_db')
+        self.rng.shuffle(ingredient_ids)
+        started = perf_counter()
+        with transaction.atomic(), manual_timestamps(User, Recipe):
+            user_ids = self.create_users(options['users'])
+            recipes = self.create_recipes(options['recipes'], user_ids)
+            recipe_ids = [pk for pk, _ in recipes]
+            self.create_recipe_relations(
+                recipe_ids,
+                ingredient_ids,
+                tag_ids,
+                options['ingredients_per_recipe'],
+            )
+            recipe_weights = zipf_weights(len(recipe_ids))
+            for model, average in (
+                (Favorite, options['favorites_per_user']),
+                (ShoppingCart, options['carts_per_user']),
+            ):
+                self.create_user_recipes(
+                    model, user_ids, recipe_ids, recipe_weights, average
+                )
+            self.create_follows(
+                user_ids,
+                sorted({author for _, author in recipes}),
+                options['follows_per_user'],
+            )
+            self.reset_sequences()
+            Version.objects.bump(RECIPES_VERSION)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        self.stdout.write(
+            Fore.GREEN
+            + f'Fake data generated in {perf_counter() - started:.1f} s'
+        )
+
+    def insert(
+        self,
+        model: models.Model,
+        rows: Iterable,
+        fields: Sequence[str] = None,
+    ) -> int:
+        """Пишет строки пакетами и сообщает скорость вставки.
+
+        Без `fields` строки — объекты модели для `bulk_create`,
+        с `fields` — кортежи значений этих полей для `executemany`.
+        """
+        started = perf_counter()
+        total = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            if fields is None:
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            else:
+                self.execute_many(model, fields, batch)
+            total += len(batch)
+        elapsed = max(perf_counter() - started, 1e-9)
+        self.stdout.write(
+            Fore.BLUE + f'{model._meta.db_table}: {total} rows '
+            f'({total / elapsed:.0f} rows/s)'
+        )
+        return total
+
+    @staticmethod
+    def execute_many(
+        model: models.Model, fields: Sequence[str], batch: List[tuple]
+    ) -> None:
+        """Вставляет кортежи одним подготовленным INSERT."""
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(model._meta.get_field(field).column) for field in fields
+        )
+        placeholders = ', '.join(['%s'] * len(fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {quote(model._meta.db_table)} '
+                f'({columns}) VALUES ({placeholders})',
+                batch,
+            )
+
+    @staticmethod
+    def next_id(model: models.Model) -> int:
+        """Первый свободный первичный ключ модели."""
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def random_moment(self):
+        return self.now - PERIOD * self.rng.random()
+
+    def create_users(self, count: int) -> List[int]:
+        """Создаёт пользователей с общим заранее захешированным паролем."""
+        start = self.next_id(User)
+        ids = list(range(start, start + count))
+        password = make_password(PASSWORD)
+        self.insert(
+            User,
+            (
+                User(
+                    id=pk,
+                    email=f'fake{pk}@example.com',
+                    username=f'fake{pk}',
+                    first_name='Имя',
+                    last_name=f'Фамилия {pk}',
+                    password=password,
+                    date_joined=self.random_moment(),
+                    updated=self.now,
+                )
+                for pk in ids
+            ),
+        )
+        return ids
+
+    def create_recipes(self, count: int, user_ids: List[int]) -> List[tuple]:
+        """Создаёт рецепты, большая часть которых у немногих авторов."""
+        if not user_ids:
+            return []
+        start = self.next_id(Recipe)
+        author_weights = zipf_weights(len(user_ids))
+        recipes = [
+            (pk, author)
+            for pk, author in zip(
+                range(start, start + count),
+                self.rng.choices(
+                    user_ids, cum_weights=author_weights, k=count
+                ),
+            )
+        ]
+        self.insert(Recipe, (self.make_recipe(*row) for row in recipes))
+        return recipes
+
+    def make_recipe(self, pk: int, author_id: int) -> Recipe:
+        created = self.random_moment()
+        return Recipe(
+            id=pk,
+            author_id=author_id,
+            name=(
+                f'{self.rng.choice(ADJECTIVES).capitalize()} '
+                f'{self.rng.choice(DISHES)} №{pk}'
+            ),
+            text=' '.join(self.rng.sample(SENTENCES, 3)),
+            image=IMAGE,
+            cooking_time=self.rng.randint(5, 180),
+            created=created,
+            updated=created,
+        )
+
+    def create_recipe_relations(
+        self,
+        recipe_ids: List[int],
+        ingredient_ids: List[int],
+        tag_ids: List[int],
+        average: int,
+    ) -> None:
+        """Создаёт ингредиенты и теги рецептов."""
+        weights = zipf_weights(len(ingredient_ids))
+        rng = self.rng
+
+        def ingredients() -> Iterator[tuple]:
+            for recipe_id in recipe_ids:
+                k = max(1, round(rng.gauss(average, average / 3)))
+                for pk in pick_unique(rng, ingredient_ids, weights, k):
+                    yield recipe_id, pk, rng.randint(1, 500)
+
+        def tags() -> Iterator[tuple]:
+            for recipe_id in recipe_ids:
+                k = rng.randint(1, len(tag_ids))
+                for pk in rng.sample(tag_ids, k):
+                    yield recipe_id, pk
+
+        self.insert(
+            IngredientRecipe, ingredients(), ('recipe', 'ingredient', 'amount')
+        )
+        self.insert(TagRecipe, tags(), ('recipe', 'tag'))
+
+    def create_user_recipes(
+        self,
+        model: models.Model,
+        user_ids: List[int],
+        recipe_ids: List[int],
+        weights: List[float],
+        average: int,
+    ) -> None:
+        """Создаёт избранное или корзины с популярными рецептами."""
+        if not recipe_ids or not average:
+            return
+        rng = self.rng
+
+        def rows() -> Iterator[tuple]:
+            for user_id in user_ids:
+                k = int(rng.expovariate(1 / average))
+                for pk in pick_unique(rng, recipe_ids, weights, k):
+                    yield user_id, pk
+
+        self.insert(model, rows(), ('user', 'recipe'))
+
+    def create_follows(
+        self, user_ids: List[int], author_ids: List[int], average: int
+    ) -> None:
+        """Создаёт подписки на авторов, кроме подписок на себя."""
+        if not author_ids or not average:
+            return
+        weights = zipf_weights(len(author_ids))
+        rng = self.rng
+
+        def rows() -> Iterator[tuple]:
+            for user_id in user_ids:
+                k = int(rng.expovariate(1 / average))
+                for pk in pick_unique(rng, author_ids, weights, k):
+                    if pk != user_id:
+                        yield user_id, pk
+
+        self.insert(Follow, rows(), ('user', 'author'))
+
+    @staticmethod
+    def reset_sequences() -> None:
+        """Сдвигает последовательности первичных ключей после вставки."""
+        sql = connection.ops.sequence_reset_sql(
+            no_style(),
+            [
+                User,
+                Recipe,
+                IngredientRecipe,
+                TagRecipe,
+                Favorite,
+                ShoppingCart,
+                Follow,
+            ],
+        )
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
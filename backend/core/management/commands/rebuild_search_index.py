@@ -0,0 +1,16 @@
+from colorama import Fore
+from core.search import rebuild_index
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    """Пересобирает полнотекстовый индекс рецептов."""
+
+    help = 'Rebuilds the recipe full-text search index'
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(Fore.BLUE + 'Rebuilding search index')
+        count = rebuild_index()
+        self.stdout.write(
+            Fore.GREEN + f'Search index rebuilt: {count} recipes'
+        )
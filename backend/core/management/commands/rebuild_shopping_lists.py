@@ -0,0 +1,45 @@
+from colorama import Fore
+from django.core.management import BaseCommand, CommandError
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    """Пересобирает или проверяет сводные списки покупок."""
+
+    help = 'Rebuilds or verifies aggregated shopping lists'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored shopping lists with the carts',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not options['check']:
+            self.stdout.write(Fore.BLUE + 'Rebuilding shopping lists')
+            count = ShoppingListItem.objects.rebuild()
+            self.stdout.write(
+                Fore.GREEN + f'Shopping lists rebuilt: {count} items'
+            )
+            return
+        expected = ShoppingListItem.objects.expected()
+        stored = {
+            (user_id, pk): amount
+            for user_id, pk, amount in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatches = [
+            key
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        if mismatches:
+            raise CommandError(
+                f'Shopping lists differ from carts in {len(mismatches)} '
+                f'items, run the command without --check to rebuild'
+            )
+        self.stdout.write(
+            Fore.GREEN + f'Shopping lists are consistent: {len(stored)} items'
+        )
@@ -0,0 +1,43 @@
+from colorama import Fore
+from core.counters import RECIPE_COUNTERS, USER_COUNTERS, reconcile
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Пересчитывает или проверяет счётчики рецептов и пользователей."""
+
+    help = 'Reconciles denormalized recipe and user counters'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that differ from the relations',
+        )
+
+    def handle(self, *args, **options) -> None:
+        check = options['check']
+        with transaction.atomic():
+            drift = {
+                'recipes': reconcile(
+                    Recipe.objects.all(), RECIPE_COUNTERS, dry_run=check
+                ),
+                'users': reconcile(
+                    User.objects.all(), USER_COUNTERS, dry_run=check
+                ),
+            }
+        summary = ', '.join(
+            f'{name}: {count}' for name, count in drift.items()
+        )
+        if check and any(drift.values()):
+            raise CommandError(
+                f'Counters drifted ({summary}), '
+                f'run the command without --check to fix them'
+            )
+        if check:
+            self.stdout.write(Fore.GREEN + 'Counters are consistent')
+            return
+        self.stdout.write(Fore.GREEN + f'Counters reconciled ({summary})')
@@ -0,0 +1,88 @@
+import json
+
+from colorama import Fore
+from core.models import SlowQuery
+from core.slow_queries import explain
+from django.core.management import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import ExpressionWrapper, F, FloatField
+
+ORDERINGS = {
+    'total': '-total_time',
+    'count': '-count',
+    'max': '-max_time',
+    'mean': '-mean_time',
+}
+
+
+class Command(BaseCommand):
+    """
+    Показывает самые затратные медленные запросы.
+    Middleware не снимает планы в обработке запроса, поэтому
+    недостающие планы снимаются здесь обычным EXPLAIN.
+    """
+
+    help = 'Prints the top slow queries recorded by SlowQueryLogMiddleware'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--order', choices=sorted(ORDERINGS), default='total'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Re-capture plans that were already stored',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Use EXPLAIN ANALYZE where the database supports it',
+        )
+        parser.add_argument(
+            '--reset', action='store_true', help='Delete all recorded queries'
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['reset']:
+            count, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(Fore.GREEN + f'Deleted {count} slow queries')
+            return
+        queries = SlowQuery.objects.annotate(
+            mean_time=ExpressionWrapper(
+                F('total_time') / F('count'), output_field=FloatField()
+            )
+        ).order_by(ORDERINGS[options['order']])[: options['limit']]
+        if not queries:
+            self.stdout.write(Fore.GREEN + 'No slow queries recorded')
+            return
+        for number, query in enumerate(queries, start=1):
+            self.stdout.write(
+                Fore.YELLOW + f'#{number} {query.count} calls, '
+                f'total {query.total_time:.1f} ms, '
+                f'mean {query.mean_time:.1f} ms, '
+                f'max {query.max_time:.1f} ms'
+            )
+            self.stdout.write(f'view: {query.view or "-"}')
+            self.stdout.write(f'call site: {query.call_site or "-"}')
+            self.stdout.write(query.sql)
+            if options['explain'] or not query.explain:
+                self.refresh_plan(query, options['analyze'])
+            if query.explain:
+                self.stdout.write(Fore.BLUE + query.explain)
+            self.stdout.write('')
+
+    @staticmethod
+    def refresh_plan(query: SlowQuery, analyze: bool) -> None:
+        """Снимает план заново по сохранённому примеру запроса."""
+        try:
+            plan = explain(
+                connection,
+                query.example,
+                json.loads(query.params or 'null'),
+                analyze=analyze,
+            )
+        except DatabaseError as error:
+            plan = f'EXPLAIN failed: {error}'
+        query.explain = plan
+        SlowQuery.objects.filter(pk=query.pk).update(explain=plan)
@@ -0,0 +1,350 @@
+import fcntl
+import json
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+from time import monotonic, time_ns
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .cache import recipe_cache
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Суммы счётчиков и гистограмм завершившихся воркеров.
+ARCHIVE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+HELP = {
+    'foodgram_http_requests_total': (
+        'counter',
+        'HTTP requests by route, method and status',
+    ),
+    'foodgram_http_request_duration_seconds': (
+        'histogram',
+        'Time to build the response by route and method',
+    ),
+    'foodgram_http_requests_in_flight': (
+        'gauge',
+        'Requests being processed by live workers',
+    ),
+    'foodgram_db_queries_total': ('counter', 'SQL queries by route'),
+    'foodgram_representation_cache_hits_total': (
+        'counter',
+        'Recipe representation cache hits',
+    ),
+    'foodgram_representation_cache_misses_total': (
+        'counter',
+        'Recipe representation cache misses',
+    ),
+    'foodgram_representation_cache_hit_ratio': (
+        'gauge',
+        'Share of recipe representations served from the cache',
+    ),
+}
+
+
+def make_labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса: счётчики, датчики и гистограммы.
+    Обновление стоит одного захвата блокировки и пары операций
+    со словарём. При заданном `METRICS_DIR` процесс не чаще раза
+    в `METRICS_FLUSH_INTERVAL` секунд пишет снимок в свой файл,
+    и эндпоинт метрик суммирует файлы всех воркеров. Файл назван
+    по pid и времени запуска, поэтому воркер с повторно выданным
+    pid не перезаписывает снимок завершившегося.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.counters: Dict[tuple, float] = defaultdict(float)
+        self.gauges: Dict[tuple, float] = defaultdict(float)
+        self.histograms: Dict[tuple, list] = {}
+        self.flushed = 0.0
+        self.pid: Optional[int] = None
+        self.started = 0
+
+    def identity(self) -> Tuple[int, int]:
+        """pid и время запуска процесса, заново после fork."""
+        pid = os.getpid()
+        if pid != self.pid:
+            self.pid, self.started = pid, time_ns()
+        return self.pid, self.started
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        with self.lock:
+            self.counters[name, labels] += value
+
+    def set_counter(self, name: str, labels: Labels, value: float) -> None:
+        """Переносит внешний накопительный счётчик процесса."""
+        with self.lock:
+            self.counters[name, labels] = value
+
+    def add_gauge(self, name: str, labels: Labels, value: float) -> None:
+        with self.lock:
+            self.gauges[name, labels] += value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """Добавляет наблюдение в гистограмму с `DURATION_BUCKETS`."""
+        index = bisect_left(DURATION_BUCKETS, value)
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [
+                    [0] * (len(DURATION_BUCKETS) + 1),
+                    0.0,
+                ]
+            histogram[0][index] += 1
+            histogram[1] += value
+
+    def snapshot(self) -> dict:
+        """Снимок метрик процесса в виде, пригодном для JSON."""
+        pid, started = self.identity()
+        with self.lock:
+            return {
+                'pid': pid,
+                'started': started,
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'gauges': [
+                    [name, labels, value]
+                    for (name, labels), value in self.gauges.items()
+                ],
+                'histograms': [
+                    [name, labels, list(buckets), total]
+                    for (name, labels), (
+                        buckets,
+                        total,
+                    ) in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        """Пишет снимок в файл процесса в общем каталоге."""
+        directory = settings.METRICS_DIR
+        now = monotonic()
+        if not directory or (
+            not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        self.flushed = now
+        export_cache_stats(self)
+        path = os.path.join(directory, snapshot_name(*self.identity()))
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+
+def export_cache_stats(registry: MetricsRegistry) -> None:
+    """Копирует счётчики кеша представлений в реестр."""
+    stats = recipe_cache.stats()
+    registry.set_counter(
+        'foodgram_representation_cache_hits_total', (), stats['hits']
+    )
+    registry.set_counter(
+        'foodgram_representation_cache_misses_total', (), stats['misses']
+    )
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def snapshot_name(pid: int, started: int) -> str:
+    return f'{pid}-{started}.json'
+
+
+def read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_archive(directory: str) -> dict:
+    """Архив завершившихся воркеров в виде снимка без датчиков."""
+    archive = read_json(os.path.join(directory, ARCHIVE)) or {}
+    return {
+        'counters': archive.get('counters', []),
+        'gauges': [],
+        'histograms': archive.get('histograms', []),
+    }
+
+
+def archive_dead(directory: str, dead: List[str]) -> None:
+    """
+    Переносит счётчики и гистограммы завершившихся воркеров в архив
+    и удаляет их файлы. Блокировка не даёт двум процессам учесть
+    один файл дважды.
+    """
+    archive_path = os.path.join(directory, ARCHIVE)
+    with open(os.path.join(directory, ARCHIVE_LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = [read_json(os.path.join(directory, name)) for name in dead]
+        snapshots = [snapshot for snapshot in snapshots if snapshot]
+        if not snapshots:
+            return
+        merged = merge([read_archive(directory), *snapshots])
+        counters = merged['counters'].items()
+        histograms = merged['histograms'].items()
+        temporary = f'{archive_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'counters': [
+                        [name, labels, value]
+                        for (name, labels), value in counters
+                    ],
+                    'histograms': [
+                        [name, labels, buckets, total]
+                        for (name, labels), (buckets, total) in histograms
+                    ],
+                },
+                f,
+            )
+        os.replace(temporary, archive_path)
+        for name in dead:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def load_snapshots(registry: MetricsRegistry) -> List[dict]:
+    """
+    Снимки живых воркеров, включая свежий снимок текущего, и архив
+    завершившихся. Снимок считается завершившимся, если процесса
+    с его pid нет или у того же pid есть снимок новее.
+    """
+    export_cache_stats(registry)
+    current = registry.snapshot()
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [current]
+    own = snapshot_name(current['pid'], current['started'])
+    workers = {}
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or '-' not in name or name == own:
+            continue
+        snapshot = read_json(os.path.join(directory, name))
+        if snapshot is not None:
+            workers[name] = snapshot
+    latest = {current['pid']: current['started']}
+    for snapshot in workers.values():
+        if is_alive(snapshot['pid']):
+            latest[snapshot['pid']] = max(
+                latest.get(snapshot['pid'], 0), snapshot['started']
+            )
+    dead = [
+        name
+        for name, snapshot in workers.items()
+        if latest.get(snapshot['pid']) != snapshot['started']
+    ]
+    if dead:
+        archive_dead(directory, dead)
+    snapshots = [current]
+    snapshots.extend(
+        snapshot for name, snapshot in workers.items() if name not in dead
+    )
+    snapshots.append(read_archive(directory))
+    return snapshots
+
+
+def merge(snapshots: Iterable[dict]) -> dict:
+    """
+    Суммирует снимки воркеров.
+    Завершившиеся воркеры попадают сюда только через архив,
+    в котором нет датчиков.
+    """
+    counters = defaultdict(float)
+    gauges = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, value in snapshot['gauges']:
+            gauges[name, tuple(map(tuple, labels))] += value
+        for name, labels, buckets, total in snapshot['histograms']:
+            key = name, tuple(map(tuple, labels))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+    hits = counters.get(('foodgram_representation_cache_hits_total', ()), 0)
+    misses = counters.get(
+        ('foodgram_representation_cache_misses_total', ()), 0
+    )
+    gauges['foodgram_representation_cache_hit_ratio', ()] = (
+        hits / (hits + misses) if hits + misses else 0.0
+    )
+    return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+def format_labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render(metrics: dict) -> str:
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    by_name = defaultdict(list)
+    for kind in ('counters', 'gauges', 'histograms'):
+        for (name, labels), value in metrics[kind].items():
+            by_name[name].append((labels, value))
+    lines = []
+    for name in sorted(by_name):
+        kind, description = HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name]):
+            if kind != 'histogram':
+                lines.append(f'{name}{format_labels(labels)} {value}')
+                continue
+            buckets, total = value
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{format_labels(labels, le=str(bound))} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,223 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+from functools import partial
+from time import perf_counter, time
+from typing import Callable
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import make_labels, registry
+from .profiling import Profile, current_profile
+from .routers import use_primary
+from .slow_queries import SlowQueryCollector, record
+
+logger = logging.getLogger('foodgram.profiling')
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование доли запросов с заголовком `Server-Timing`.
+    Для выбранного запроса считаются SQL-запросы и их время,
+    время представления, проверок доступа, фильтров и сериализации,
+    а итог пишется строкой JSON в лог `foodgram.profiling`.
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        profile = Profile()
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                with profile.timer('total'):
+                    response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(
+            json.dumps(
+                {
+                    'method': request.method,
+                    'path': request.path,
+                    'view': getattr(request.resolver_match, 'view_name', None),
+                    'status': response.status_code,
+                    'queries': profile.queries,
+                    'timings': profile.as_dict(),
+                    'bytes': (
+                        None if response.streaming else len(response.content)
+                    ),
+                },
+                ensure_ascii=False,
+            )
+        )
+        return response
+
+
+def call_on_close(response: HttpResponse, callback: Callable) -> None:
+    """
+    Вызывает `callback` при закрытии ответа, до сигнала
+    `request_finished`, который может закрыть соединения с базой.
+    Сервер закрывает ответ после отправки тела, поэтому работа
+    в `callback` не задерживает ответ клиенту.
+    """
+    close = response.close
+
+    def close_after_callback() -> None:
+        try:
+            callback()
+        finally:
+            close()
+
+    response.close = close_after_callback
+
+
+class SlowQueryLogMiddleware:
+    """
+    Журнал медленных SQL-запросов.
+    Запросы дольше `SLOW_QUERY_THRESHOLD_MS` собираются во время
+    обработки, а после отправки ответа пишутся в лог
+    `foodgram.slow_queries` и в модель `SlowQuery` с подсчётом
+    по отпечатку запроса.
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        entries = []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(
+                        SlowQueryCollector(connection.alias, entries)
+                    )
+                )
+            response = self.get_response(request)
+        if entries:
+            view = getattr(request.resolver_match, 'view_name', None)
+            call_on_close(response, partial(record, entries, view))
+        return response
+
+
+class QueryCounter:
+    """Обёртка `execute_wrapper`, считающая SQL-запросы."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Метрики запросов для эндпоинта `/api/metrics`.
+    Считает запросы по маршруту, методу и статусу, время ответа,
+    число SQL-запросов и запросы в обработке.
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        queries = QueryCounter()
+        registry.add_gauge('foodgram_http_requests_in_flight', (), 1)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            registry.add_gauge('foodgram_http_requests_in_flight', (), -1)
+        duration = perf_counter() - started
+        route = getattr(request.resolver_match, 'view_name', None)
+        route = route or 'unmatched'
+        registry.inc(
+            'foodgram_http_requests_total',
+            make_labels(
+                route=route,
+                method=request.method,
+                status=str(response.status_code),
+            ),
+        )
+        registry.observe(
+            'foodgram_http_request_duration_seconds',
+            make_labels(route=route, method=request.method),
+            duration,
+        )
+        registry.inc(
+            'foodgram_db_queries_total',
+            make_labels(route=route),
+            queries.count,
+        )
+        registry.flush()
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы читают с реплик, остальные - с основной базы.
+    После записи ответ ставит cookie, и следующие чтения клиента
+    `DATABASE_STICKY_SECONDS` секунд тоже идут на основную базу.
+    Представление с атрибутом `use_primary_db = True` всегда
+    читает с основной базы.
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    @staticmethod
+    def needs_primary(request: HttpRequest) -> bool:
+        if request.method not in SAFE_METHODS:
+            return True
+        if request.META.get(settings.DATABASE_PRIMARY_HEADER):
+            return True
+        until = request.COOKIES.get(settings.DATABASE_STICKY_COOKIE, '')
+        return until.isdigit() and int(until) > time()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        token = use_primary.set(self.needs_primary(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        if request.method not in SAFE_METHODS:
+            window = settings.DATABASE_STICKY_SECONDS
+            response.set_cookie(
+                settings.DATABASE_STICKY_COOKIE,
+                str(int(time()) + window),
+                max_age=window,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(
+        self, request: HttpRequest, view_func, view_args, view_kwargs
+    ) -> None:
+        view = getattr(view_func, 'cls', view_func)
+        if getattr(view, 'use_primary_db', False):
+            use_primary.set(True)
@@ -0,0 +1,85 @@
+# Generated by Django 3.2 on 2026-10-18 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'fingerprint',
+                    models.CharField(
+                        max_length=40, unique=True, verbose_name='Отпечаток'
+                    ),
+                ),
+                ('sql', models.TextField(verbose_name='Нормализованный SQL')),
+                ('example', models.TextField(verbose_name='Пример запроса')),
+                (
+                    'params',
+                    models.TextField(blank=True, verbose_name='Параметры'),
+                ),
+                (
+                    'view',
+                    models.CharField(
+                        blank=True,
+                        max_length=200,
+                        verbose_name='Представление',
+                    ),
+                ),
+                (
+                    'call_site',
+                    models.CharField(
+                        blank=True, max_length=300, verbose_name='Место вызова'
+                    ),
+                ),
+                (
+                    'count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Количество'
+                    ),
+                ),
+                (
+                    'total_time',
+                    models.FloatField(verbose_name='Суммарное время, мс'),
+                ),
+                (
+                    'max_time',
+                    models.FloatField(verbose_name='Максимальное время, мс'),
+                ),
+                (
+                    'explain',
+                    models.TextField(blank=True, verbose_name='План запроса'),
+                ),
+                (
+                    'first_seen',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Впервые'
+                    ),
+                ),
+                (
+                    'last_seen',
+                    models.DateTimeField(verbose_name='Последний раз'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ('-total_time',),
+            },
+        ),
+    ]
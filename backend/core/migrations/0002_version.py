@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0001_slowquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Version',
+            fields=[
+                (
+                    'name',
+                    models.CharField(
+                        max_length=50,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='Название',
+                    ),
+                ),
+                (
+                    'value',
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name='Значение'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+    ]
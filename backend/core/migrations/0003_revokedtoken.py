@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0002_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                (
+                    'jti',
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='Идентификатор токена',
+                    ),
+                ),
+                (
+                    'expires',
+                    models.DateTimeField(
+                        db_index=True, verbose_name='Истекает'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Отозванный токен',
+                'verbose_name_plural': 'Отозванные токены',
+            },
+        ),
+    ]
@@ -0,0 +1,118 @@
+import hashlib
+from typing import Optional, Tuple
+
+from core.catalog import get_catalog_version
+from core.profiling import profiled
+from django.db.models import Model, QuerySet
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+Version = Tuple[tuple, Optional[float]]
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для list и retrieve.
+    Представление сообщает дешёвую версию ответа до выборки данных,
+    при совпадении `If-None-Match` или `If-Modified-Since`
+    клиент получает 304 без запросов за страницей и сериализации.
+    """
+
+    def get_list_version(self, request: Request) -> Optional[Version]:
+        """
+        Возвращает части ETag и время изменения списка
+        или None, если список отдаётся без условного GET.
+        """
+        return None
+
+    def get_object_version(
+        self, request: Request, pk: str
+    ) -> Optional[Version]:
+        """
+        Возвращает части ETag и время изменения объекта
+        или None, если объект отдаётся без условного GET.
+        """
+        return None
+
+    def conditional_response(
+        self, request: Request, version: Version, handler, *args, **kwargs
+    ) -> Response:
+        """Метод отвечает 304 при совпадении версии или вызывает handler."""
+        parts, last_modified = version
+        parts += (request.get_host(), get_catalog_version())
+        etag = quote_etag(
+            hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+        )
+        if request.user.is_authenticated:
+            last_modified = None
+        if last_modified is not None:
+            last_modified = int(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        version = self.get_list_version(request)
+        if version is None:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(
+            request, version, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        version = self.get_object_version(request, kwargs[self.lookup_field])
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            request, version, super().retrieve, *args, **kwargs
+        )
+
+
+class ProfiledViewMixin:
+    """
+    Замер участков представления DRF для профилирования запросов.
+    Вне профилируемого запроса добавляет только проверку contextvar.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with profiled('view'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request: Request) -> None:
+        with profiled('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request: Request) -> None:
+        with profiled('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request: Request, obj: Model) -> None:
+        with profiled('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        with profiled('filter'):
+            return super().filter_queryset(queryset)
+
+
+class ProfiledSerializerMixin:
+    """Замер `to_representation` на внешнем уровне вложенности."""
+
+    def to_representation(self, instance):
+        with profiled('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+from django.db import models, router
+from django.db.models import F
+from django.utils import timezone
+
+
+class SlowQuery(models.Model):
+    """Медленный SQL-запрос, сгруппированный по отпечатку."""
+
+    fingerprint = models.CharField(
+        verbose_name='Отпечаток', max_length=40, unique=True
+    )
+    sql = models.TextField(verbose_name='Нормализованный SQL')
+    example = models.TextField(verbose_name='Пример запроса')
+    params = models.TextField(verbose_name='Параметры', blank=True)
+    view = models.CharField(
+        verbose_name='Представление', max_length=200, blank=True
+    )
+    call_site = models.CharField(
+        verbose_name='Место вызова', max_length=300, blank=True
+    )
+    count = models.PositiveIntegerField(verbose_name='Количество', default=0)
+    total_time = models.FloatField(verbose_name='Суммарное время, мс')
+    max_time = models.FloatField(verbose_name='Максимальное время, мс')
+    explain = models.TextField(verbose_name='План запроса', blank=True)
+    first_seen = models.DateTimeField(
+        verbose_name='Впервые', auto_now_add=True
+    )
+    last_seen = models.DateTimeField(verbose_name='Последний раз')
+
+    class Meta:
+        ordering = ('-total_time',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self) -> str:
+        return f'{self.count} × {self.sql[:80]}'
+
+
+# Версия всех рецептов: меняется при создании, изменении и удалении
+# рецепта и при изменении данных автора.
+RECIPES_VERSION = 'recipes'
+
+
+class VersionManager(models.Manager):
+    def get_value(self, name: str) -> int:
+        """Текущее значение счётчика с основной базы, 0 если его нет."""
+        value = (
+            self.using(router.db_for_write(self.model))
+            .filter(name=name)
+            .values_list('value', flat=True)
+            .first()
+        )
+        return value or 0
+
+    def bump(self, name: str) -> None:
+        """Увеличивает счётчик на единицу, создавая его при необходимости."""
+        if self.filter(name=name).update(value=F('value') + 1):
+            return
+        _, created = self.get_or_create(name=name, defaults={'value': 1})
+        if not created:
+            self.filter(name=name).update(value=F('value') + 1)
+
+
+class Version(models.Model):
+    """
+    Именованный счётчик версии данных, общий для всех процессов.
+    Увеличивается при изменении данных и входит в ключи кешей и ETag.
+    """
+
+    name = models.CharField(
+        verbose_name='Название', max_length=50, primary_key=True
+    )
+    value = models.PositiveBigIntegerField(verbose_name='Значение', default=0)
+
+    objects = VersionManager()
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.value}'
+
+
+class RevokedTokenManager(models.Manager):
+    def revoke(self, jti: str, expires: datetime) -> None:
+        """Отзывает токен и удаляет записи об уже истёкших токенах."""
+        now = timezone.now()
+        if expires <= now:
+            return
+        self.bulk_create(
+            [self.model(jti=jti, expires=expires)], ignore_conflicts=True
+        )
+        self.filter(expires__lte=now).delete()
+
+    def is_revoked(self, jti: str) -> bool:
+        return (
+            self.using(router.db_for_write(self.model))
+            .filter(jti=jti)
+            .exists()
+        )
+
+
+class RevokedToken(models.Model):
+    """
+    Отозванный JWT. Хранится в базе, чтобы отзыв был виден всем
+    процессам и не терялся при вытеснении из кеша, и удаляется
+    после истечения срока действия токена. Кеш лишь избавляет
+    чтение от запроса к этой таблице.
+    """
+
+    jti = models.CharField(
+        verbose_name='Идентификатор токена', max_length=255, primary_key=True
+    )
+    expires = models.DateTimeField(verbose_name='Истекает', db_index=True)
+
+    objects = RevokedTokenManager()
+
+    class Meta:
+        verbose_name = 'Отозванный токен'
+        verbose_name_plural = 'Отозванные токены'
+
+    def __str__(self) -> str:
+        return self.jti
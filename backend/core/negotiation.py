@@ -0,0 +1,26 @@
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.request import Request
+
+
+class FallbackContentNegotiation(DefaultContentNegotiation):
+    """
+    Согласование формата с выбором первого рендерера по умолчанию.
+    Неподходящий заголовок `Accept` не приводит к ошибке 406,
+    явно запрошенный параметром `format` формат проверяется как обычно.
+    """
+
+    def select_renderer(
+        self, request: Request, renderers: list, format_suffix: str = None
+    ) -> tuple:
+        """Метод выбирает рендерер, не отклоняя запрос из-за `Accept`."""
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            if format_suffix or request.query_params.get(
+                self.settings.URL_FORMAT_OVERRIDE
+            ):
+                raise
+            renderer: BaseRenderer = renderers[0]
+            return renderer, renderer.media_type
@@ -1,5 +1,18 @@
+import json
+from typing import Optional, Sequence, Union
+
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 
 class CustomPagination(PageNumberPagination):
@@ -7,3 +20,151 @@ class CustomPagination(PageNumberPagination):
 
     page_size_query_param = 'limit'
     page_size = settings.PAGE_SIZE
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Курсорный пагинатор по ключу (created, id) без подсчёта строк.
+    `CursorPagination` фильтрует только по первому полю сортировки
+    и пропускает строки с одинаковым значением через OFFSET. Здесь
+    позиция курсора хранит все поля сортировки, поэтому она уникальна
+    и следующая страница выбирается условием по ключу целиком.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = settings.PAGE_SIZE
+    ordering = ('-created', '-id')
+
+    def _get_position_from_instance(
+        self, instance: Union[Model, dict], ordering: Sequence[str]
+    ) -> str:
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[name]))
+            else:
+                values.append(str(getattr(instance, name)))
+        return json.dumps(values)
+
+    def parse_position(self, queryset: QuerySet, position: str) -> list:
+        """Разбирает позицию курсора в значения полей сортировки."""
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(
+                self.ordering
+            ):
+                raise ValueError
+            return [
+                queryset.model._meta.get_field(order.lstrip('-')).to_python(
+                    value
+                )
+                for order, value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, queryset: QuerySet, reverse: bool) -> Q:
+        """
+        Условие `(a, b) < (x, y)` в виде `a < x OR (a = x AND b < y)`
+        с направлением сравнения для каждого поля сортировки.
+        """
+        values = self.parse_position(queryset, self.cursor.position)
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view: APIView = None
+    ) -> Optional[list]:
+        """Метод повторяет `CursorPagination` с фильтром по ключу."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.keyset_filter(queryset, reverse))
+        end = offset + self.page_size + 1
+        results = list(queryset[offset:end])
+        self.page = results[: self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class SwitchablePagination(CustomPagination):
+    """
+    Постраничный пагинатор с курсорным режимом по запросу клиента.
+    Курсорный режим включается параметром `pagination=cursor`
+    или передачей курсора из ссылок `next` и `previous`.
+    Порядок курсора берётся из атрибута `cursor_ordering` представления.
+    Параметры из `cursor_excluded_params` задают свой порядок выдачи,
+    который курсор по ключу сохранить не может, поэтому с ними всегда
+    используется постраничный режим.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_pagination_class = CustomCursorPagination
+
+    def is_cursor_mode(self, request: Request, view: APIView = None) -> bool:
+        """Метод определяет, запрошен и доступен ли курсорный режим."""
+        params = request.query_params
+        excluded = getattr(view, 'cursor_excluded_params', ())
+        if any(params.get(param) for param in excluded):
+            return False
+        cursor_class = self.cursor_pagination_class
+        return (
+            params.get(self.mode_query_param) == self.cursor_mode
+            or cursor_class.cursor_query_param in params
+        )
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view: APIView = None
+    ) -> list:
+        """Метод выбирает режим пагинации и возвращает страницу."""
+        self.cursor_paginator = None
+        if not self.is_cursor_mode(request, view):
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.cursor_pagination_class()
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            self.cursor_paginator.ordering = ordering
+        return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        """Метод формирует ответ в формате выбранного режима."""
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,43 @@
+import json
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson превращает целые длиннее 64 бит во float, а json - нет.
+LONG_NUMBER = re.compile(rb'\d{20}')
+
+
+class ORJSONParser(JSONParser):
+    """
+    Парсер JSON на orjson для тел запросов в UTF-8.
+    Тела с целыми больше 64 бит и тела, которые orjson не разбирает,
+    передаются стандартному json с теми же ошибками, что у `JSONParser`.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Метод разбирает тело запроса через orjson или стандартный json."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if not LONG_NUMBER.search(content):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        try:
+            return json.loads(
+                content.decode(encoding),
+                parse_constant=strict_constant if self.strict else None,
+            )
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
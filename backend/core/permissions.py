@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.db.models import Model
 from rest_framework import permissions
 from rest_framework.request import Request
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 
@@ -20,3 +22,13 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
             request.method in permissions.SAFE_METHODS
             or obj.author == request.user
         )
+
+
+class IsAdminOrLocalhost(permissions.BasePermission):
+    """Доступ администраторам и запросам с локального адреса."""
+
+    def has_permission(self, request: Request, view: APIView) -> bool:
+        return (
+            request.user.is_staff
+            or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        )
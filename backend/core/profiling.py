@@ -0,0 +1,69 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, Iterator, Optional
+
+
+class Profile:
+    """
+    Замеры одного запроса: время по участкам и запросы к базе.
+    Участки одного имени суммируются, вложенные вызовы
+    одного участка учитываются только на внешнем уровне.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.depth: Dict[str, int] = defaultdict(int)
+        self.queries = 0
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Добавляет время выполнения блока к участку `name`."""
+        self.depth[name] += 1
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.depth[name] -= 1
+            if not self.depth[name]:
+                self.timings[name] += perf_counter() - started
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка `connection.execute_wrapper` для учёта SQL."""
+        self.queries += 1
+        with self.timer('db'):
+            return execute(sql, params, many, context)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Время участков в миллисекундах."""
+        return {
+            name: round(seconds * 1000, 2)
+            for name, seconds in self.timings.items()
+        }
+
+    def server_timing(self) -> str:
+        """Значение заголовка `Server-Timing`."""
+        metrics = []
+        for name, duration in self.as_dict().items():
+            metric = f'{name};dur={duration}'
+            if name == 'db':
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+
+current_profile: ContextVar[Optional[Profile]] = ContextVar(
+    'current_profile', default=None
+)
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[None]:
+    """Замеряет блок, если текущий запрос профилируется."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.timer(name):
+        yield
@@ -0,0 +1,85 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson не экранирует эти символы, а JSONRenderer экранирует,
+# чтобы ответ оставался корректным JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер форматов списка покупок.
+    Сам список отдаётся потоком из представления,
+    рендерер используется для выбора формата и вывода ошибок.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Метод выводит данные ответа с ошибкой в формате JSON."""
+        return JSONRenderer().render(data)
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    """Рендерер списка покупок в формате txt."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    """Рендерер списка покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ShoppingListRenderer):
+    """Рендерер списка покупок в формате PDF."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Рендерер JSON на orjson с тем же выводом, что у `JSONRenderer`.
+    Даты, время и Decimal передаются кодировщику DRF. Отступы,
+    настройки вывода, отличные от компактного Unicode, отсутствие
+    orjson и данные, которые он не умеет кодировать, обрабатываются
+    стандартным `JSONRenderer`.
+    """
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Метод кодирует данные через orjson или стандартный json."""
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
@@ -0,0 +1,33 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models import Model
+
+# Чтение с основной базы включено везде, кроме безопасных запросов,
+# для которых его выключает `ReplicaRoutingMiddleware`: команды и shell
+# не должны читать отстающую реплику перед записью.
+use_primary: ContextVar[bool] = ContextVar('use_primary', default=True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение в безопасных запросах со случайной реплики,
+    запись и всё остальное - с основной базы `default`.
+    """
+
+    def db_for_read(self, model: Model, **hints) -> str:
+        if use_primary.get() or not settings.DATABASE_REPLICAS:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model: Model, **hints) -> str:
+        return 'default'
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints) -> bool:
+        """Реплики содержат те же данные, что и основная база."""
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        """Миграции применяются к основной базе и доходят до реплик."""
+        return db == 'default'
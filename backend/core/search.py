@@ -0,0 +1,141 @@
+import re
+from typing import Callable, List
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import BooleanField, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from recipes.models import Recipe
+
+# PostgreSQL хранит вектор в генерируемом столбце рецептов,
+# SQLite - в отдельной таблице FTS5, где rowid совпадает с id рецепта.
+SEARCH_COLUMN = 'search_vector'
+SEARCH_TABLE = 'recipes_recipe_fts'
+SEARCH_CONFIG = 'russian'
+# Совпадение в названии весит больше, чем совпадение в описании.
+NAME_WEIGHT = 4.0
+TEXT_WEIGHT = 1.0
+
+WORD = re.compile(r'[^\W_]+')
+
+Quote = Callable[[str], str]
+
+
+def search_terms(value: str) -> List[str]:
+    """Слова запроса без операторов и знаков препинания."""
+    return WORD.findall(value.lower())[: settings.MAX_SEARCH_TERMS]
+
+
+def postgresql_search(
+    queryset: QuerySet, terms: List[str], quote: Quote
+) -> QuerySet:
+    """Поиск по префиксам слов после стемминга русской конфигурации."""
+    column = f'{quote(Recipe._meta.db_table)}.{quote(SEARCH_COLUMN)}'
+    tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+    query = ' & '.join(f'{term}:*' for term in terms)
+    return queryset.filter(
+        RawSQL(f'{column} @@ {tsquery}', (query,), BooleanField())
+    ).annotate(
+        search_rank=RawSQL(
+            f'ts_rank({column}, {tsquery})', (query,), FloatField()
+        )
+    )
+
+
+def sqlite_search(
+    queryset: QuerySet, terms: List[str], quote: Quote
+) -> QuerySet:
+    """Поиск по префиксам слов, ранг - BM25 с весами столбцов."""
+    table = quote(SEARCH_TABLE)
+    query = ' '.join(f'"{term}"*' for term in terms)
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (query,)
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT -bm25({table}, {NAME_WEIGHT}, {TEXT_WEIGHT}) '
+            f'FROM {table} WHERE {table} MATCH %s AND rowid = '
+            f'{quote(Recipe._meta.db_table)}.{quote(Recipe._meta.pk.column)}',
+            (query,),
+            FloatField(),
+        )
+    )
+
+
+def fallback_search(
+    queryset: QuerySet, terms: List[str], quote: Quote
+) -> QuerySet:
+    """Поиск без индекса для остальных СУБД."""
+    for term in terms:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(text__icontains=term)
+        )
+    return queryset.annotate(search_rank=Value(0.0, FloatField()))
+
+
+SEARCH_BACKENDS = {
+    'postgresql': postgresql_search,
+    'sqlite': sqlite_search,
+}
+
+
+def search_recipes(queryset: QuerySet, value: str) -> QuerySet:
+    """
+    Оставляет рецепты, в названии или описании которых есть все слова
+    запроса, и добавляет аннотацию `search_rank` - чем больше, тем
+    точнее совпадение. Запрос без слов не меняет выборку.
+    """
+    terms = search_terms(value)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, FloatField()))
+    connection = connections[queryset.db]
+    search = SEARCH_BACKENDS.get(connection.vendor, fallback_search)
+    return search(queryset, terms, connection.ops.quote_name)
+
+
+def get_index_connection() -> BaseDatabaseWrapper:
+    return connections[router.db_for_write(Recipe)]
+
+
+def index_recipe(recipe: Recipe) -> None:
+    """Обновляет рецепт в таблице FTS5, в PostgreSQL вектор считает СУБД."""
+    connection = get_index_connection()
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, text) '
+            f'VALUES (%s, %s, %s)',
+            (recipe.pk, recipe.name, recipe.text),
+        )
+
+
+def unindex_recipe(recipe_id: int) -> None:
+    """Удаляет рецепт из таблицы FTS5."""
+    connection = get_index_connection()
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', (recipe_id,)
+        )
+
+
+def rebuild_index() -> int:
+    """
+    Заполняет таблицу FTS5 заново, например после `bulk_create`,
+    который не отправляет сигналы. Возвращает число рецептов в индексе.
+    """
+    connection = get_index_connection()
+    if connection.vendor == 'sqlite':
+        recipes = connection.ops.quote_name(Recipe._meta.db_table)
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, name, text) '
+                    f'SELECT id, name, text FROM {recipes}'
+                )
+    return Recipe.objects.using(connection.alias).count()
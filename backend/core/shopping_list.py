@@ -0,0 +1,158 @@
+import csv
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+Row = Tuple[str, str, int]
+
+TITLE = 'Нужно купить:'
+
+logger = logging.getLogger('foodgram.shopping_list')
+
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+
+
+class PDFFontError(Exception):
+    """Шрифт `SHOPPING_LIST_PDF_FONT` не удалось загрузить."""
+
+
+# Ошибки, при которых PDF не получен и клиенту отвечают 503.
+PDF_ERRORS = (FutureTimeoutError, BrokenProcessPool, PDFFontError)
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку для `csv.writer`."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def format_row(name: str, unit: str, amount: int) -> str:
+    """Формирует строку списка покупок."""
+    return f'{name} ({unit}) - {amount}'
+
+
+def iter_txt(rows: Iterable[Row]) -> Iterator[str]:
+    """Отдаёт список покупок в формате txt построчно."""
+    yield TITLE
+    for row in rows:
+        yield '\n' + format_row(*row)
+
+
+def iter_csv(rows: Iterable[Row]) -> Iterator[str]:
+    """Отдаёт список покупок в формате CSV построчно."""
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(('Ингредиент', 'Единица', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_pdf(rows: List[Row], font_path: str) -> bytes:
+    """Рисует постраничный PDF со списком покупок.
+
+    Функция выполняется в отдельном процессе и не обращается к Django.
+    Ошибка шрифта передаётся как `PDFFontError`, чтобы процессу
+    приложения не нужно было импортировать reportlab.
+    """
+    from io import BytesIO
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+    from reportlab.pdfgen import canvas
+
+    font = 'ShoppingListFont'
+    if font not in pdfmetrics.getRegisteredFontNames():
+        try:
+            pdfmetrics.registerFont(TTFont(font, font_path))
+        except TTFError as error:
+            raise PDFFontError(str(error))
+    width, height = A4
+    margin, step = 20 * mm, 7 * mm
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle('Список покупок')
+    page = 1
+
+    def start_page(title: bool) -> float:
+        y = height - margin
+        if title:
+            pdf.setFont(font, 16)
+            pdf.drawString(margin, y, TITLE)
+            y -= step * 2
+        pdf.setFont(font, 9)
+        pdf.drawRightString(width - margin, margin / 2, str(page))
+        pdf.setFont(font, 12)
+        return y
+
+    y = start_page(title=True)
+    for row in rows:
+        if y < margin:
+            pdf.showPage()
+            page += 1
+            y = start_page(title=False)
+        pdf.drawString(margin, y, '• ' + format_row(*row))
+        y -= step
+    pdf.save()
+    return buffer.getvalue()
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Возвращает ограниченный пул процессов для отрисовки PDF."""
+    global _pdf_executor
+    if _pdf_executor is None:
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=settings.SHOPPING_LIST_PDF_WORKERS
+        )
+    return _pdf_executor
+
+
+def make_pdf(rows: Iterable[Row]) -> bytes:
+    """
+    Отрисовывает PDF в пуле процессов и ждёт результат не дольше
+    `SHOPPING_LIST_PDF_TIMEOUT` секунд. Вызывается до начала ответа,
+    чтобы ошибку отрисовки можно было вернуть статусом.
+    Воркер приложения всё это время занят ожиданием: пул ограничивает
+    нагрузку на процессор, а таймаут - время ожидания. Отрисовка,
+    которая уже началась, после таймаута не прерывается и занимает
+    процесс пула до конца, отменить можно только ещё не начатую.
+    Бросает исключения из `PDF_ERRORS`.
+    """
+    global _pdf_executor
+    try:
+        future = get_pdf_executor().submit(
+            render_pdf, list(rows), settings.SHOPPING_LIST_PDF_FONT
+        )
+    except BrokenProcessPool:
+        _pdf_executor = None
+        raise
+    try:
+        return future.result(timeout=settings.SHOPPING_LIST_PDF_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+    except BrokenProcessPool:
+        _pdf_executor = None
+        raise
+    except PDFFontError:
+        logger.exception('Shopping list PDF font failed to load')
+        raise
+
+
+def iter_bytes(content: bytes) -> Iterator[bytes]:
+    """Отдаёт готовый файл частями по `SHOPPING_LIST_CHUNK_SIZE`."""
+    size = settings.SHOPPING_LIST_CHUNK_SIZE
+    for start in range(0, len(content), size):
+        end = start + size
+        yield content[start:end]
+
+
+EXPORTERS = {
+    'txt': iter_txt,
+    'csv': iter_csv,
+}
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import traceback
+from datetime import datetime
+from time import perf_counter
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+
+logger = logging.getLogger('foodgram.slow_queries')
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+LISTS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+SPACES = re.compile(r'\s+')
+# Обёртки, через которые проходят почти все запросы, место вызова не дают.
+SKIPPED_FILES = (
+    'core/middleware.py',
+    'core/mixins.py',
+    'core/profiling.py',
+    'core/slow_queries.py',
+)
+
+
+def normalize(sql: str) -> str:
+    """Убирает из SQL литералы и длину списков `IN (...)`."""
+    sql = STRINGS.sub('?', sql)
+    sql = NUMBERS.sub('?', sql)
+    sql = LISTS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(sql.encode()).hexdigest()
+
+
+def call_site() -> str:
+    """Первый кадр стека из кода проекта, а не из библиотек."""
+    root = str(settings.BASE_DIR.parent)
+    for frame in reversed(traceback.extract_stack()):
+        if (
+            frame.filename.startswith(root)
+            and 'site-packages' not in frame.filename
+            and not frame.filename.endswith(SKIPPED_FILES)
+        ):
+            path = os.path.relpath(frame.filename, root)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+def explain(connection, sql: str, params, analyze: bool = False) -> str:
+    """План запроса через префикс EXPLAIN текущей базы.
+
+    План снимается только для SELECT, потому что `EXPLAIN ANALYZE`
+    выполняет запрос. ANALYZE поддерживается только PostgreSQL.
+    """
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    options = {'analyze': True} if analyze else {}
+    if connection.vendor != 'postgresql':
+        options = {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(
+            ' '.join(str(value) for value in row) for row in cursor.fetchall()
+        )
+
+
+class SlowQueryEntry(NamedTuple):
+    sql: str
+    params: object
+    duration: float
+    call_site: str
+    alias: str
+
+
+class SlowQueryCollector:
+    """
+    Обёртка `execute_wrapper`, собирающая медленные запросы.
+    Во время обработки запоминаются только SQL, параметры и время,
+    сохраняет их `record` после отправки ответа.
+    """
+
+    def __init__(self, alias: str, entries: List[SlowQueryEntry]) -> None:
+        self.alias = alias
+        self.entries = entries
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self.entries.append(
+                    SlowQueryEntry(
+                        sql, params, duration, call_site(), self.alias
+                    )
+                )
+
+
+def record(entries: List[SlowQueryEntry], view: Optional[str]) -> None:
+    """
+    Сохраняет медленные запросы с подсчётом по отпечатку.
+    План не снимается: EXPLAIN ANALYZE выполнил бы медленный запрос
+    повторно, планы снимает команда `slow_queries`.
+    """
+    now = timezone.now()
+    for entry in entries:
+        sql = normalize(entry.sql)
+        key = fingerprint(sql)
+        params = json.dumps(entry.params, default=str, ensure_ascii=False)
+        logger.warning(
+            json.dumps(
+                {
+                    'fingerprint': key,
+                    'duration': round(entry.duration, 2),
+                    'view': view,
+                    'call_site': entry.call_site,
+                    'sql': sql,
+                },
+                ensure_ascii=False,
+            )
+        )
+        try:
+            save_entry(key, sql, params, entry, view, now)
+        except DatabaseError:
+            logger.exception('Failed to record slow query %s', key)
+
+
+def save_entry(
+    key: str,
+    sql: str,
+    params: str,
+    entry: SlowQueryEntry,
+    view: Optional[str],
+    now: datetime,
+) -> None:
+    """Прибавляет вызов к записи отпечатка или создаёт её."""
+    values = {
+        'example': entry.sql,
+        'params': params,
+        'view': view or '',
+        'call_site': entry.call_site,
+        'last_seen': now,
+    }
+    updated = SlowQuery.objects.filter(fingerprint=key).update(
+        count=F('count') + 1,
+        total_time=F('total_time') + entry.duration,
+        max_time=Greatest('max_time', entry.duration),
+        **values,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                fingerprint=key,
+                sql=sql,
+                count=1,
+                total_time=entry.duration,
+                max_time=entry.duration,
+                **values,
+            )
+    except IntegrityError:
+        SlowQuery.objects.filter(fingerprint=key).update(
+            count=F('count') + 1,
+            total_time=F('total_time') + entry.duration,
+            max_time=Greatest('max_time', entry.duration),
+        )
@@ -1,3 +1,6 @@
+import os
+from datetime import timedelta
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -26,6 +29,10 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# 'token' - токены DRF в базе, 'jwt' - подписанные токены доступа,
+# которые для чтения не загружают пользователя из базы.
+AUTH_MODE = os.environ.get('AUTH_MODE', default='token')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -33,6 +40,15 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
@@ -41,6 +57,23 @@ REST_FRAMEWORK = {
     ],
 }
 
+if AUTH_MODE == 'jwt':
+    # Выданные раньше токены DRF продолжают работать.
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(
+        0, 'core.authentication.JWTAuthentication'
+    )
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.environ.get('JWT_ACCESS_MINUTES', default=15))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.environ.get('JWT_REFRESH_DAYS', default=7))
+    ),
+    'AUTH_HEADER_TYPES': ('Bearer', 'Token'),
+    'AUTH_TOKEN_CLASSES': ('core.authentication.AccessToken',),
+    'UPDATE_LAST_LOGIN': False,
+}
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
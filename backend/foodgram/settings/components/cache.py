@@ -0,0 +1,34 @@
+import os
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# Локальный кеш у каждого процесса свой и не видит удалений из других,
+# поэтому кеш представлений по умолчанию включается только с общим.
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+REPRESENTATION_CACHE_ENABLED = (
+    os.environ.get('REPRESENTATION_CACHE_ENABLED', default=str(SHARED_CACHE))
+    == 'True'
+)
+
+REPRESENTATION_CACHE_TIMEOUT = int(
+    os.environ.get('REPRESENTATION_CACHE_TIMEOUT', default=60 * 60)
+)
+
+# Версия каталога хранится в базе, кеш лишь избавляет от запроса к ней.
+# С локальным кешем другие процессы видят изменение каталога не позже
+# чем через это число секунд, с общим (Redis, Memcached) - сразу.
+CATALOG_VERSION_TIMEOUT = int(
+    os.environ.get('CATALOG_VERSION_TIMEOUT', default=5)
+)
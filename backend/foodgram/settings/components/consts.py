@@ -7,3 +7,13 @@ DEFAULT_EMAIL_LENGTH = 254
 MAX_LENGTH = 200
 
 MIN_VALUE = 1
+
+BULK_BATCH_SIZE = 1000
+
+MAX_BULK_RECIPES = 100
+
+MAX_SEARCH_TERMS = 10
+
+SHOPPING_LIST_CHUNK_SIZE = 64 * 1024
+
+CATALOG_MAX_AGE = 365 * 24 * 60 * 60
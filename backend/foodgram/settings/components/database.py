@@ -14,3 +14,40 @@ DATABASES = {
         'PORT': os.environ.get('DB_PORT', default='5432'),
     }
 }
+
+# Реплики только для чтения: хосты PostgreSQL или имена баз
+# (для SQLite - пути к файлам) через запятую.
+DB_REPLICA_HOSTS = [
+    host
+    for host in os.environ.get('DB_REPLICA_HOSTS', default='').split(',')
+    if host
+]
+DB_REPLICA_NAMES = [
+    name
+    for name in os.environ.get('DB_REPLICA_NAMES', default='').split(',')
+    if name
+]
+
+DATABASE_REPLICAS = []
+for index in range(max(len(DB_REPLICA_HOSTS), len(DB_REPLICA_NAMES))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if index < len(DB_REPLICA_HOSTS):
+        DATABASES[alias]['HOST'] = DB_REPLICA_HOSTS[index]
+    if index < len(DB_REPLICA_NAMES):
+        DATABASES[alias]['NAME'] = DB_REPLICA_NAMES[index]
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = (
+    ['core.routers.PrimaryReplicaRouter'] if DATABASE_REPLICAS else []
+)
+
+# После записи чтения пользователя остаются на основной базе
+# на время, за которое реплики успевают догнать её.
+DATABASE_STICKY_SECONDS = int(os.environ.get('DB_STICKY_SECONDS', default=10))
+DATABASE_STICKY_COOKIE = 'primary_db_until'
+# Клиенты без cookie могут запросить основную базу заголовком.
+DATABASE_PRIMARY_HEADER = 'HTTP_X_PRIMARY_DB'
@@ -0,0 +1,19 @@
+import os
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
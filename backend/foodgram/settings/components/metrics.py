@@ -0,0 +1,15 @@
+import os
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', default='True') == 'True'
+
+# Общий каталог для снимков метрик воркеров gunicorn.
+# Без него эндпоинт показывает метрики только одного процесса.
+METRICS_DIR = os.environ.get('METRICS_DIR', default='')
+
+METRICS_FLUSH_INTERVAL = float(
+    os.environ.get('METRICS_FLUSH_INTERVAL', default=5)
+)
+
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1 ::1'
+).split()
@@ -1,4 +1,8 @@
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
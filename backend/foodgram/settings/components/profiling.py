@@ -0,0 +1,9 @@
+import os
+
+PROFILING_ENABLED = (
+    os.environ.get('PROFILING_ENABLED', default='False') == 'True'
+)
+
+PROFILING_SAMPLE_RATE = float(
+    os.environ.get('PROFILING_SAMPLE_RATE', default=0.01)
+)
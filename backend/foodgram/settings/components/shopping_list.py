@@ -0,0 +1,15 @@
+import os
+
+SHOPPING_LIST_PDF_WORKERS = int(
+    os.environ.get('SHOPPING_LIST_PDF_WORKERS', default=2)
+)
+
+# Столько секунд воркер приложения ждёт отрисовки PDF перед ответом 503.
+SHOPPING_LIST_PDF_TIMEOUT = int(
+    os.environ.get('SHOPPING_LIST_PDF_TIMEOUT', default=30)
+)
+
+SHOPPING_LIST_PDF_FONT = os.environ.get(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
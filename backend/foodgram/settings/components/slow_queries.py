@@ -0,0 +1,9 @@
+import os
+
+SLOW_QUERY_LOG_ENABLED = (
+    os.environ.get('SLOW_QUERY_LOG_ENABLED', default='False') == 'True'
+)
+
+SLOW_QUERY_THRESHOLD_MS = float(
+    os.environ.get('SLOW_QUERY_THRESHOLD_MS', default=200)
+)
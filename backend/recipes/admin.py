@@ -1,6 +1,10 @@
+from core.counters import reconcile_recipes, reconcile_users
+from core.models import RECIPES_VERSION, Version
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.admin import display
+from django.db.models import QuerySet
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
 from .models import (
@@ -9,6 +13,7 @@ from .models import (
     IngredientRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 
@@ -50,9 +55,28 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientInLine,
     )
 
+    def save_model(self, request, obj, form, change):
+        old_author = form.initial.get('author') if change else None
+        super().save_model(request, obj, form, change)
+        reconcile_users({obj.author_id, old_author} - {None})
+
+    def save_related(self, request, form, formsets, change):
+        old_amounts = ShoppingListItem.objects.recipe_amounts(form.instance.id)
+        super().save_related(request, form, formsets, change)
+        ShoppingListItem.objects.sync_recipe(form.instance.id, old_amounts)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        reconcile_users([obj.author_id])
+
+    def delete_queryset(self, request, queryset: QuerySet):
+        author_ids = set(queryset.values_list('author_id', flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_users(author_ids)
+
     @display(description='Частота в избранном')
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     @display(description='Ингредиенты')
     def list_of_ingredients(self, obj):
@@ -98,6 +122,36 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'recipe',
     )
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            initial = form.initial
+            ShoppingListItem.objects.remove_recipe(
+                initial['user'], initial['recipe']
+            )
+        super().save_model(request, obj, form, change)
+        ShoppingListItem.objects.add_recipe(obj.user_id, obj.recipe_id)
+        reconcile_recipes({obj.recipe_id, form.initial.get('recipe')} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        reconcile_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset: QuerySet):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_recipes(recipe_ids)
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'amount',
+    )
+    list_select_related = ('user', 'ingredient')
+    readonly_fields = ('user', 'ingredient', 'amount')
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -106,6 +160,19 @@ class FavoriteAdmin(admin.ModelAdmin):
         'recipe',
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        reconcile_recipes({obj.recipe_id, form.initial.get('recipe')} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        reconcile_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset: QuerySet):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_recipes(recipe_ids)
+
 
 @admin.register(IngredientRecipe)
 class IngredientRecipeAdmin(admin.ModelAdmin):
@@ -114,3 +181,42 @@ class IngredientRecipeAdmin(admin.ModelAdmin):
         'ingredient',
         'amount',
     )
+
+    @staticmethod
+    def touch_recipes(recipe_ids) -> None:
+        """
+        Отмечает рецепты изменёнными: `update` не отправляет сигналов,
+        поэтому версия рецептов увеличивается здесь.
+        """
+        Recipe.objects.filter(pk__in=recipe_ids).update(updated=timezone.now())
+        Version.objects.bump(RECIPES_VERSION)
+
+    def save_model(self, request, obj, form, change):
+        old_recipe = form.initial.get('recipe') if change else None
+        recipe_ids = {obj.recipe_id, old_recipe} - {None}
+        old_amounts = {
+            pk: ShoppingListItem.objects.recipe_amounts(pk)
+            for pk in recipe_ids
+        }
+        super().save_model(request, obj, form, change)
+        for pk in recipe_ids:
+            ShoppingListItem.objects.sync_recipe(pk, old_amounts[pk])
+        self.touch_recipes(recipe_ids)
+
+    def delete_model(self, request, obj):
+        old_amounts = ShoppingListItem.objects.recipe_amounts(obj.recipe_id)
+        super().delete_model(request, obj)
+        ShoppingListItem.objects.sync_recipe(obj.recipe_id, old_amounts)
+        self.touch_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset: QuerySet):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        recipe_ids.discard(None)
+        old_amounts = {
+            pk: ShoppingListItem.objects.recipe_amounts(pk)
+            for pk in recipe_ids
+        }
+        super().delete_queryset(request, queryset)
+        for pk in recipe_ids:
+            ShoppingListItem.objects.sync_recipe(pk, old_amounts[pk])
+        self.touch_recipes(recipe_ids)
@@ -0,0 +1,82 @@
+# Generated by Django 3.2 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = (
+        IngredientRecipe.objects.filter(
+            recipe__shopping_cart__isnull=False, ingredient__isnull=False
+        )
+        .values_list('recipe__shopping_cart__user_id', 'ingredient_id')
+        .annotate(total=Sum('amount'))
+    )
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=pk, amount=total)
+            for user_id, pk, total in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_auto_20230604_2038'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'amount',
+                    models.IntegerField(verbose_name='Общее количество'),
+                ),
+                (
+                    'ingredient',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='shopping_list_items',
+                        to='recipes.ingredient',
+                        verbose_name='Ингредиент',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='shopping_list',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Пользователь',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'ingredient'), name='unique_shopping_list_item'
+            ),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
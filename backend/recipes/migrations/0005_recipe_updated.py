@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(
+                auto_now=True, verbose_name='Дата изменения'
+            ),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
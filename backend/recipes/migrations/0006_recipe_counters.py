@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, lookup):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{lookup: OuterRef('pk')})
+            .order_by()
+            .values(lookup)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    Recipe.objects.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        in_carts_count=count_related(ShoppingCart, 'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0005_recipe_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В избранном'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В корзинах'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
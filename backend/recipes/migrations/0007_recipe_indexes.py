@@ -0,0 +1,72 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+# `name__istartswith` на PostgreSQL превращается в
+# UPPER("name"::text) LIKE UPPER(%s), а на SQLite в LIKE, который без
+# учёта регистра использует только индекс с COLLATE NOCASE.
+INGREDIENT_NAME_INDEX = {
+    'postgresql': (
+        'CREATE INDEX ingredient_name_prefix_idx ON recipes_ingredient '
+        '(UPPER("name"::text) text_pattern_ops)'
+    ),
+    'sqlite': (
+        'CREATE INDEX ingredient_name_prefix_idx ON recipes_ingredient '
+        '("name" COLLATE NOCASE)'
+    ),
+}
+
+
+def remove_duplicate_tags(apps, schema_editor):
+    TagRecipe = apps.get_model('recipes', 'TagRecipe')
+    duplicates = (
+        TagRecipe.objects.filter(tag__isnull=False, recipe__isnull=False)
+        .values('tag', 'recipe')
+        .annotate(keep=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        TagRecipe.objects.filter(tag=row['tag'], recipe=row['recipe']).exclude(
+            id=row['keep']
+        ).delete()
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    sql = INGREDIENT_NAME_INDEX.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql)
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor in INGREDIENT_NAME_INDEX:
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS ingredient_name_prefix_idx'
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0006_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created'], name='recipe_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-created'], name='recipe_author_created_idx'
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tagrecipe',
+            constraint=models.UniqueConstraint(
+                fields=('tag', 'recipe'), name='unique_tag_recipe'
+            ),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+# Генерируемый столбец требует PostgreSQL 12, FTS5 входит в сборки
+# SQLite, которые поставляются с Python.
+CREATE_SEARCH = {
+    'postgresql': (
+        'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector '
+        "GENERATED ALWAYS AS (setweight(to_tsvector('russian', "
+        "coalesce(name, '')), 'A') || setweight(to_tsvector('russian', "
+        "coalesce(text, '')), 'B')) STORED",
+        'CREATE INDEX recipe_search_idx ON recipes_recipe '
+        'USING GIN (search_vector)',
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(name, text, '
+        "tokenize = 'unicode61 remove_diacritics 2')",
+        'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+        'SELECT id, name, text FROM recipes_recipe',
+    ),
+}
+DROP_SEARCH = {
+    'postgresql': (
+        'DROP INDEX IF EXISTS recipe_search_idx',
+        'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+    ),
+    'sqlite': ('DROP TABLE IF EXISTS recipes_recipe_fts',),
+}
+
+
+def create_search(apps, schema_editor):
+    for sql in CREATE_SEARCH.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    for sql in DROP_SEARCH.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0007_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
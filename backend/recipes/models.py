@@ -1,7 +1,10 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from core.validators import HexValidator, MinValidator
 from django.conf import settings
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connections, models, router, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Case, F, Sum, UniqueConstraint, Value, When
 from users.models import User
 
 
@@ -63,6 +66,9 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Модель рецептов."""
 
+    # Поля, которые попадают в поисковый индекс.
+    SEARCH_FIELDS = ('name', 'text')
+
     tags = models.ManyToManyField(
         Tag, through='TagRecipe', related_name='recipes', verbose_name='Тег'
     )
@@ -93,15 +99,53 @@ class Recipe(models.Model):
     created = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах', default=0, editable=False
+    )
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['-created'], name='recipe_created_idx'),
+            models.Index(
+                fields=['author', '-created'], name='recipe_author_created_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values) -> 'Recipe':
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & set(cls.SEARCH_FIELDS):
+            instance.mark_indexed()
+        return instance
+
+    def mark_indexed(self) -> None:
+        """Запоминает поля, с которыми рецепт лежит в поисковом индексе."""
+        self._indexed = tuple(
+            getattr(self, field) for field in self.SEARCH_FIELDS
+        )
+
+    def search_fields_changed(self) -> bool:
+        """
+        Изменились ли поля поиска с загрузки из базы. Для рецепта,
+        загруженного без этих полей, считается, что изменились.
+        """
+        indexed = getattr(self, '_indexed', None)
+        return indexed != tuple(
+            getattr(self, field) for field in self.SEARCH_FIELDS
+        )
+
 
 class TagRecipe(models.Model):
     """Модель для тегов с рецептом."""
@@ -122,6 +166,11 @@ class TagRecipe(models.Model):
     )
 
     class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=('tag', 'recipe'), name='unique_tag_recipe'
+            ),
+        ]
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецепта'
 
@@ -170,6 +219,126 @@ class IngredientRecipe(models.Model):
         )
 
 
+class UserRecipeManager(models.Manager):
+    """Менеджер связей пользователя с рецептом одиночными запросами."""
+
+    def add(self, user_id: int, recipe_id: int) -> bool:
+        """
+        Добавляет связь одним INSERT ... SELECT без ошибки при конфликте.
+        Возвращает False, если связь уже есть или рецепта не существует.
+        """
+        connection, names = self.sql_parts()
+        ops = connection.ops
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} {names["table"]} '
+            f'({names["user"]}, {names["recipe"]}) '
+            f'SELECT %s, {names["recipe_pk"]} FROM {names["recipes"]} '
+            f'WHERE {names["recipe_pk"]} = %s '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (user_id, recipe_id))
+            return cursor.rowcount == 1
+
+    def remove(self, user_id: int, recipe_id: int) -> bool:
+        """
+        Удаляет связь одним DELETE без сигналов, возвращает False,
+        если её не было.
+        """
+        connection, names = self.sql_parts()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {names["table"]} WHERE {names["user"]} = %s '
+                f'AND {names["recipe"]} = %s',
+                (user_id, recipe_id),
+            )
+            return cursor.rowcount > 0
+
+    def sql_parts(self) -> Tuple[BaseDatabaseWrapper, Dict[str, str]]:
+        """Соединение для записи и экранированные имена таблиц и столбцов."""
+        connection = connections[router.db_for_write(self.model)]
+        quote = connection.ops.quote_name
+        opts = self.model._meta
+        return connection, {
+            'table': quote(opts.db_table),
+            'user': quote(opts.get_field('user').column),
+            'recipe': quote(opts.get_field('recipe').column),
+            'recipes': quote(Recipe._meta.db_table),
+            'recipe_pk': quote(Recipe._meta.pk.column),
+        }
+
+    @staticmethod
+    def can_return(connection: BaseDatabaseWrapper) -> bool:
+        """RETURNING есть в PostgreSQL и в SQLite начиная с 3.35."""
+        if connection.vendor == 'sqlite':
+            return connection.Database.sqlite_version_info >= (3, 35)
+        return connection.vendor == 'postgresql'
+
+    def add_many(self, user_id: int, recipe_ids: List[int]) -> List[int]:
+        """
+        Добавляет связи с рецептами одним INSERT ... SELECT.
+        Возвращает id рецептов, для которых связь появилась, без уже
+        добавленных и несуществующих.
+        """
+        if not recipe_ids:
+            return []
+        connection, names = self.sql_parts()
+        ops = connection.ops
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} {names["table"]} '
+            f'({names["user"]}, {names["recipe"]}) '
+            f'SELECT %s, {names["recipe_pk"]} FROM {names["recipes"]} '
+            f'WHERE {names["recipe_pk"]} IN '
+            f'({", ".join(["%s"] * len(recipe_ids))}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        params = (user_id, *recipe_ids)
+        existing = self.filter(user_id=user_id, recipe_id__in=recipe_ids)
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                if self.can_return(connection):
+                    cursor.execute(
+                        f'{sql} RETURNING {names["recipe"]}', params
+                    )
+                    return [row[0] for row in cursor.fetchall()]
+                before = set(existing.values_list('recipe_id', flat=True))
+                cursor.execute(sql, params)
+            after = existing.values_list('recipe_id', flat=True)
+            return [pk for pk in after if pk not in before]
+
+    def remove_many(
+        self, user_id: int, recipe_ids: Optional[List[int]] = None
+    ) -> List[int]:
+        """
+        Удаляет связи с рецептами одним DELETE без сигналов, без списка -
+        все связи пользователя. Возвращает id рецептов, связи с которыми
+        удалены.
+        """
+        if recipe_ids is not None and not recipe_ids:
+            return []
+        connection, names = self.sql_parts()
+        sql = f'DELETE FROM {names["table"]} WHERE {names["user"]} = %s'
+        params = (user_id,)
+        if recipe_ids is not None:
+            sql += (
+                f' AND {names["recipe"]} IN '
+                f'({", ".join(["%s"] * len(recipe_ids))})'
+            )
+            params += tuple(recipe_ids)
+        if not self.can_return(connection):
+            with transaction.atomic(using=connection.alias):
+                queryset = self.filter(user_id=user_id)
+                if recipe_ids is not None:
+                    queryset = queryset.filter(recipe_id__in=recipe_ids)
+                removed = list(queryset.values_list('recipe_id', flat=True))
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+            return removed
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING {names["recipe"]}', params)
+            return [row[0] for row in cursor.fetchall()]
+
+
 class UserRecipeBaseModel(models.Model):
     """Модель для связи рецепта и юзера."""
 
@@ -180,6 +349,8 @@ class UserRecipeBaseModel(models.Model):
         Recipe, on_delete=models.CASCADE, verbose_name='Рецепт'
     )
 
+    objects = UserRecipeManager()
+
     class Meta:
         abstract = True
         constraints = [
@@ -197,6 +368,8 @@ class UserRecipeBaseModel(models.Model):
 class Favorite(UserRecipeBaseModel):
     """Модель избранных рецептов."""
 
+    counter_field = 'favorites_count'
+
     class Meta(UserRecipeBaseModel.Meta):
         default_related_name = 'favorites'
         verbose_name = 'Избранный рецепт'
@@ -206,7 +379,174 @@ class Favorite(UserRecipeBaseModel):
 class ShoppingCart(UserRecipeBaseModel):
     """Модель корзины покупок."""
 
+    counter_field = 'in_carts_count'
+
     class Meta(UserRecipeBaseModel.Meta):
         default_related_name = 'shopping_cart'
         verbose_name = 'Рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
+
+
+class ShoppingListManager(models.Manager):
+    """Менеджер сводного списка покупок пользователей."""
+
+    @staticmethod
+    def recipe_amounts(recipe_id: int) -> Dict[int, int]:
+        """Возвращает количества ингредиентов рецепта по их id."""
+        return dict(
+            IngredientRecipe.objects.filter(
+                recipe_id=recipe_id, ingredient__isnull=False
+            ).values_list('ingredient_id', 'amount')
+        )
+
+    def apply_delta(
+        self, user_ids: Iterable[int], amounts: Dict[int, int]
+    ) -> None:
+        """Прибавляет изменения количеств к спискам покупок пользователей."""
+        user_ids = list(user_ids)
+        amounts = {pk: amount for pk, amount in amounts.items() if amount}
+        if not user_ids or not amounts:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=pk, amount=0)
+                    for user_id in user_ids
+                    for pk, amount in amounts.items()
+                    if amount > 0
+                ],
+                ignore_conflicts=True,
+            )
+            self.filter(
+                user_id__in=user_ids, ingredient_id__in=amounts
+            ).update(
+                amount=F('amount')
+                + Case(
+                    *[
+                        When(ingredient_id=pk, then=Value(amount))
+                        for pk, amount in amounts.items()
+                    ],
+                    default=Value(0),
+                    output_field=models.IntegerField(),
+                )
+            )
+            self.filter(user_id__in=user_ids, amount__lte=0).delete()
+
+    @staticmethod
+    def recipes_amounts(recipe_ids: Iterable[int]) -> Dict[int, int]:
+        """Возвращает суммарные количества ингредиентов рецептов."""
+        return dict(
+            IngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids, ingredient__isnull=False
+            )
+            .order_by()
+            .values_list('ingredient_id')
+            .annotate(total=Sum('amount'))
+        )
+
+    def add_recipes(self, user_id: int, recipe_ids: List[int]) -> None:
+        """Добавляет ингредиенты нескольких рецептов в список покупок."""
+        self.apply_delta([user_id], self.recipes_amounts(recipe_ids))
+
+    def remove_recipes(self, user_id: int, recipe_ids: List[int]) -> None:
+        """Убирает ингредиенты нескольких рецептов из списка покупок."""
+        amounts = self.recipes_amounts(recipe_ids)
+        self.apply_delta(
+            [user_id], {pk: -amount for pk, amount in amounts.items()}
+        )
+
+    def add_recipe(self, user_id: int, recipe_id: int) -> None:
+        """Добавляет ингредиенты рецепта в список покупок."""
+        self.apply_delta([user_id], self.recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_id: int, recipe_id: int) -> None:
+        """Убирает ингредиенты рецепта из списка покупок."""
+        amounts = self.recipe_amounts(recipe_id)
+        self.apply_delta(
+            [user_id], {pk: -amount for pk, amount in amounts.items()}
+        )
+
+    def sync_recipe(
+        self,
+        recipe_id: int,
+        old_amounts: Dict[int, int],
+        new_amounts: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """Переносит изменения состава рецепта в списки покупок."""
+        if new_amounts is None:
+            new_amounts = self.recipe_amounts(recipe_id)
+        delta = {
+            pk: new_amounts.get(pk, 0) - old_amounts.get(pk, 0)
+            for pk in new_amounts.keys() | old_amounts.keys()
+        }
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+        self.apply_delta(user_ids, delta)
+
+    @staticmethod
+    def expected(user_ids: Optional[Iterable[int]] = None) -> Dict:
+        """Считает списки покупок заново по корзинам пользователей."""
+        lookups = {
+            'recipe__shopping_cart__isnull': False,
+            'ingredient__isnull': False,
+        }
+        if user_ids is not None:
+            lookups['recipe__shopping_cart__user_id__in'] = user_ids
+        rows = (
+            IngredientRecipe.objects.filter(**lookups)
+            .values_list('recipe__shopping_cart__user_id', 'ingredient_id')
+            .annotate(total=Sum('amount'))
+        )
+        return {(user_id, pk): total for user_id, pk, total in rows}
+
+    def rebuild(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Пересобирает списки покупок и возвращает число позиций."""
+        if user_ids is not None:
+            user_ids = list(user_ids)
+        expected = self.expected(user_ids)
+        with transaction.atomic():
+            queryset = self.all()
+            if user_ids is not None:
+                queryset = queryset.filter(user_id__in=user_ids)
+            queryset.delete()
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=pk, amount=total)
+                    for (user_id, pk), total in expected.items()
+                ],
+                batch_size=settings.BULK_BATCH_SIZE,
+            )
+        return len(expected)
+
+
+class ShoppingListItem(models.Model):
+    """Модель сводного списка покупок, поддерживаемого вместе с корзиной."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField(verbose_name='Общее количество')
+
+    objects = ShoppingListManager()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'), name='unique_shopping_list_item'
+            ),
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+
+    def __str__(self) -> str:
+        return f'{self.ingredient} - {self.amount} у {self.user}'
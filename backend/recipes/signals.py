@@ -0,0 +1,74 @@
+from core.cache import recipe_cache
+from core.catalog import bump_catalog_version
+from core.models import RECIPES_VERSION, Version
+from core.search import index_recipe, unindex_recipe
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from users.models import User
+
+from .models import Ingredient, Recipe, ShoppingCart, ShoppingListItem, Tag
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(**kwargs) -> None:
+    """Сбрасывает версию каталога при изменении ингредиентов и тегов."""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=User)
+def author_changed(
+    instance: User, created: bool, update_fields=None, **kwargs
+) -> None:
+    """
+    Меняет версию рецептов при изменении данных автора.
+    Закешированные представления его рецептов устаревают сами:
+    в их отметку входит дата изменения автора.
+    """
+    if created or (
+        update_fields and set(update_fields) <= {'last_login', 'password'}
+    ):
+        return
+    Version.objects.bump(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(
+    instance: Recipe, created: bool, update_fields=None, **kwargs
+) -> None:
+    """
+    Обновляет версию рецептов и поисковый индекс.
+    Индекс не трогается, если название и описание не менялись.
+    """
+    Version.objects.bump(RECIPES_VERSION)
+    if update_fields and not set(update_fields) & set(Recipe.SEARCH_FIELDS):
+        return
+    if not created and not instance.search_fields_changed():
+        return
+    index_recipe(instance)
+    instance.mark_indexed()
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance: Recipe, **kwargs) -> None:
+    """Удаляет закешированное представление и поисковую запись рецепта."""
+    Version.objects.bump(RECIPES_VERSION)
+    recipe_cache.invalidate([instance.id])
+    unindex_recipe(instance.id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_deleted(instance: ShoppingCart, **kwargs) -> None:
+    """
+    Убирает ингредиенты рецепта из списка покупок при любом удалении
+    из корзины через ORM, в том числе каскадном при удалении рецепта
+    или пользователя. Django отправляет сигналы корзин раньше сигналов
+    рецептов, пока состав рецепта ещё в базе, поэтому отдельная очистка
+    при удалении рецепта вычла бы его дважды. Удаления из API идут
+    SQL-запросами без сигналов и обновляют списки сами.
+    """
+    ShoppingListItem.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
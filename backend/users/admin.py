@@ -20,8 +20,8 @@ class UserAdmin(admin.ModelAdmin):
 
     @admin.display(description='Рецепты пользователя')
     def recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     @admin.display(description='Подписчики пользователя')
     def follows_count(self, obj):
-        return obj.following.count()
+        return obj.followers_count
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(model, lookup):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{lookup: OuterRef('pk')})
+            .order_by()
+            .values(lookup)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Follow, 'author'),
+        following_count=count_related(Follow, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipes', '0005_recipe_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Рецепты'
+            ),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Подписчики'
+            ),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Подписки'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
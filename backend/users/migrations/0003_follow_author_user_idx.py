@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ),
+    ]
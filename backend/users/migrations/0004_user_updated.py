@@ -0,0 +1,21 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0003_follow_author_user_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated',
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name='Дата изменения',
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -30,6 +30,18 @@ class User(AbstractUser):
         verbose_name='Фамилия',
         max_length=settings.DEFAULT_FIELD_LENGTH,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецепты', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчики', default=0, editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписки', default=0, editable=False
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True
+    )
 
     def validate_username(self, value: str) -> str:
         """Проверка валидности username"""
@@ -66,6 +78,11 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='uniq_follow'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        )
         verbose_name = 'Подписка'
         verbose_name_plural = "Подписки"
 